@@ -0,0 +1,178 @@
+#####################################
+######## bisimulation minimization of a compact ReachabilityGraph
+#### states that no sequence of transitions can tell apart are merged into one state of a QuotientGraph, i.e: the
+#### markings of a net that only differ by a permutation of symmetric tokens. The QuotientGraph is a ReachabilityGraph,
+#### a TransitionSystem shows it and PetriNetLiveness analyses it like the graph it comes from
+from array import array
+from PetriNetEngine import MarkingStore, ReachabilityGraph
+from PetriNetLiveness import tarjan
+
+TAU = -1    # the silent step of branching bisimulation, no transition has this index
+
+#### QuotientGraph: one state per block of bisimilar states of 'graph', the state of a block is named by the marking of its
+#### first state, the block of the initial state is state 0. block[s] is the state of the quotient holding state s of 'graph'
+class QuotientGraph(ReachabilityGraph):
+    def __init__(self, graph, block, representatives) -> None:
+        store = MarkingStore(graph.store.size, graph.store.bits)
+        for s in representatives:
+            store.addPacked(graph.store.packed[s])
+        super().__init__(graph.net, store)
+        self.source = graph # the ReachabilityGraph that was minimized
+        self.block = block  # state of 'source' -> state of the quotient
+        self.representatives = representatives  # state of the quotient -> its first state of 'source'
+        self.reduced = graph.reduced
+
+    def find(self, marking):    # state of the quotient holding a marking vector, None if it is not reachable
+        s = self.source.find(marking)
+        return None if s is None else self.block[s]
+
+#### return the strong bisimulation blocks of the states of 'graph' as (block, count), block[s] in 0 .. count-1.
+#### Partition refinement: a block is split by the signatures {(transition, block of the target)} of its states and only the
+#### predecessors of the states moved to a new block are signed again, the other states of their block keep a common signature.
+#### The states live in one array grouped by block, so moving a state out of its block is a swap
+def strongBlocks(graph):
+    n = len(graph)
+    offsets, targets, labels = graph.offsets, graph.targets, graph.labels
+    predOffsets = array('l', [0])*(n + 1)  # reverse edges in CSR form
+    for t in targets:
+        predOffsets[t + 1] += 1
+    for s in range(n):
+        predOffsets[s + 1] += predOffsets[s]
+    preds = array('l', [0])*len(targets)
+    fill = array('l', predOffsets)
+    for s in range(n):
+        for e in range(offsets[s], offsets[s + 1]):
+            t = targets[e]
+            preds[fill[t]] = s
+            fill[t] += 1
+    elems = array('l', range(n))    # states grouped by block, block b is elems[first[b] .. end[b]-1]
+    where = array('l', range(n))    # position of every state in elems
+    block = array('l', [0])*n
+    first = [0]
+    end = [n]
+    marked = bytearray([1])*n   # states waiting in 'touched'
+    touched = {0 : list(range(n))}  # block -> its states whose signature may have changed
+    queue = [0] if n > 0 else []
+    def signature(s):
+        return frozenset([(labels[e], block[targets[e]]) for e in range(offsets[s], offsets[s + 1])])
+    while queue:
+        b = queue.pop()
+        states = touched.pop(b)
+        keep = None     # signature of the states that stay in b
+        if end[b] - first[b] > len(states):
+            i = first[b]
+            while marked[elems[i]]:
+                i += 1
+            keep = signature(elems[i])
+        groups = {}
+        for s in states:
+            marked[s] = 0
+            groups.setdefault(signature(s), []).append(s)
+        if keep is None:
+            keep = max(groups, key = lambda x: len(groups[x]))
+        moved = []
+        for key, group in groups.items():
+            if key == keep:
+                continue
+            top = end[b]
+            for s in group:     # swap s to the end of b and shrink b
+                end[b] -= 1
+                other = elems[end[b]]
+                elems[where[s]] = other
+                where[other] = where[s]
+                elems[end[b]] = s
+                where[s] = end[b]
+                block[s] = len(first)
+            first.append(end[b])
+            end.append(top)
+            moved.extend(group)
+        for s in moved:
+            for i in range(predOffsets[s], predOffsets[s + 1]):
+                x = preds[i]
+                if not marked[x]:
+                    marked[x] = 1
+                    c = block[x]
+                    if c not in touched:
+                        touched[c] = []
+                        queue.append(c)
+                    touched[c].append(x)
+    return block, len(first)
+
+#### return the branching bisimulation blocks of the states of 'graph' as (block, count), the transitions of 'hidden' (indices)
+#### being silent steps. The cycles of silent steps are merged first, then the blocks are refined in rounds (Blom and Orzan):
+#### the signature of a state is what it does after silent steps inside its block, i.e: the visible steps and the silent steps
+#### leaving the block. Every hidden transition is the same silent step TAU. The merged cycles make it blind to divergence,
+#### a silent cycle is not told apart from its exits
+def branchingBlocks(graph, hidden):
+    n = len(graph)
+    offsets, targets, labels = graph.offsets, graph.targets, graph.labels
+    silentOffsets = array('l', [0])
+    silentTargets = array('l')
+    for s in range(n):
+        for e in range(offsets[s], offsets[s + 1]):
+            if labels[e] in hidden:
+                silentTargets.append(targets[e])
+        silentOffsets.append(len(silentTargets))
+    cycle, count = tarjan(n, n, silentOffsets, silentTargets)   # silent steps between cycles go to smaller numbers
+    steps = [set() for c in range(count)]   # (transition or TAU, cycle) steps of every cycle, silent steps inside it dropped
+    for s in range(n):
+        c = cycle[s]
+        for e in range(offsets[s], offsets[s + 1]):
+            d = cycle[targets[e]]
+            if labels[e] not in hidden:
+                steps[c].add((labels[e], d))
+            elif d != c:
+                steps[c].add((TAU, d))
+    part = [0]*count
+    blocks = 1 if count > 0 else 0
+    while True:
+        signatures = [None]*count
+        for c in range(count):
+            signature = set()
+            for t, d in steps[c]:
+                if t == TAU and part[d] == part[c]:     # inert step, d < c is signed already
+                    signature |= signatures[d]
+                else:
+                    signature.add((t, part[d]))
+            signatures[c] = frozenset(signature)
+        ids = {}
+        fresh = [ids.setdefault((part[c], signatures[c]), len(ids)) for c in range(count)]
+        if len(ids) == blocks:
+            break
+        part = fresh
+        blocks = len(ids)
+    return array('l', [part[cycle[s]] for s in range(n)]), blocks
+
+#### return the QuotientGraph of 'graph' by strong bisimulation, or by branching bisimulation when 'hidden' lists the indices of
+#### the silent transitions. Silent steps inside a block are dropped, the others are labelled by the first hidden transition,
+#### so two silent steps to the same block make one edge. Raise ValueError if the graph is truncated
+def minimize(graph, hidden = None):
+    if graph.truncated:
+        raise ValueError("the graph is truncated, its unexpanded states can not be compared")
+    hidden = set() if hidden is None else set(hidden)
+    block, count = branchingBlocks(graph, hidden) if hidden else strongBlocks(graph)
+    number = [-1]*count     # blocks numbered in the order of their first state, so the initial state stays 0
+    representatives = []
+    for s in range(len(graph)):
+        if number[block[s]] == -1:
+            number[block[s]] = len(representatives)
+            representatives.append(s)
+    block = array('l', [number[x] for x in block])
+    silent = min(hidden) if hidden else None    # label of the silent edges of the quotient
+    steps = [set() for x in representatives]
+    offsets, targets, labels = graph.offsets, graph.targets, graph.labels
+    for s in range(len(graph)):
+        b = block[s]
+        for e in range(offsets[s], offsets[s + 1]):
+            c = block[targets[e]]
+            if labels[e] not in hidden:
+                steps[b].add((labels[e], c))
+            elif c != b:
+                steps[b].add((silent, c))
+    quotient = QuotientGraph(graph, block, representatives)
+    for x in steps:
+        for t, c in sorted(x):
+            quotient.labels.append(t)
+            quotient.targets.append(c)
+        quotient.offsets.append(len(quotient.targets))
+    return quotient
@@ -0,0 +1,118 @@
+#####################################
+######## batch analyzer of Petri Net files, the command line entry point besides the GUI, without pygame
+#### a net file is JSON, see PetriNetCore.PetriNet.fromDict. Every net gives one JSON line on the output with its number of states
+#### and edges, its deadlocks and, with --ts, its whole transition system, with --invariants its P- and T-invariants,
+#### with --siphons its minimal siphons and traps and whether they prove it deadlock free, with --liveness its components,
+#### reversibility and the liveness level of every transition, with --minimize the size of its bisimulation quotient.
+#### A net stops after --max-states states (MAX_STATES by default), so an unbounded net gives an incomplete report instead of a hang.
+#### usage: python PetriNetCLI.py nets/ extra.json --jobs 8 --ts -o report.jsonl
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from PetriNetCore import PetriNet
+
+MAX_STATES = 1000000    # default --max-states, a batch never hangs on an unbounded net
+
+def netFiles(paths):    # return the net files of 'paths', a directory gives its *.json files sorted by name
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, x) for x in sorted(os.listdir(path)) if x.endswith(".json"))
+        else:
+            files.append(path)
+    return files
+
+def analyze(path, options): # explore the net of the file 'path' from its marking, return its report as a dict
+    start = time.monotonic()
+    try:
+        with open(path) as file:
+            net = PetriNet.fromDict(json.load(file))
+        names = options.names.split(",") if options.names else list(net.places)
+        structure = {}
+        if options.invariants:  # P-invariant bounds prove boundedness without exploring
+            bounds = net.placeBounds()
+            structure = {"pInvariants" : net.pInvariants(), "tInvariants" : net.tInvariants(), "bounds" : bounds, "conservative" : None not in bounds.values()}
+        if options.siphons: # the siphon-trap property proves deadlock freedom without exploring
+            check = net.siphonTrapCheck(options.timeout)
+            check["seconds"] = round(check["seconds"], 3)
+            structure["siphons"] = check
+        if options.no_explore:
+            return dict({"file" : path, "seconds" : round(time.monotonic() - start, 3)}, **structure)
+        ts = net.reachabilityGraph(names, options.workers, options.stubborn, maxStates = options.max_states or None, maxMemory = options.max_memory, timeout = options.timeout)
+        quotient = None
+        if options.minimize and not ts.graph.truncated: # strong bisimulation, branching with --hidden
+            quotient = ts.minimize(options.hidden.split(",") if options.hidden else None).graph
+    except (OSError, ValueError, KeyError, TypeError, IndexError) as error:
+        return {"file" : path, "error" : "%s: %s" % (type(error).__name__, error)}
+    graph = ts.graph
+    deadlocks = ts.deadlocks()
+    report = {"file" : path, "states" : len(graph), "edges" : graph.numEdges(), "deadlocks" : len(deadlocks),
+        "firstDeadlock" : ts.label(deadlocks[0]) if deadlocks else None, "complete" : not graph.truncated, "stopReason" : graph.stopReason,
+        "reduced" : graph.reduced, "seconds" : round(time.monotonic() - start, 3)}
+    if options.minimize:    # None for a truncated graph
+        report["quotient"] = None if quotient is None else {"states" : len(quotient), "edges" : quotient.numEdges(), "deadlocks" : len(quotient.deadlocks())}
+    if options.liveness:    # deadlocks are in the report already
+        behavior = ts.behavior()
+        del behavior["deadlocks"]
+        report["liveness"] = behavior
+    report.update(structure)
+    if options.ts:  # states are numbered from 0, the initial state, edges are [source, transition, target]
+        report["ts"] = {"names" : names, "states" : [ts.label(x) for x in range(ts.count)],
+            "edges" : [[x, name, y] for x in range(ts.rows) for name, y in ts.successors(x)], "deadlocks" : deadlocks}
+    return report
+
+def analyzeJob(job):    # analyze() for a process of the pool, 'job' is (path, options)
+    return analyze(*job)
+
+def parser():
+    parser = argparse.ArgumentParser(description = "Build the reachability graph (transition system) of Petri Net files and report states and deadlocks.")
+    parser.add_argument("paths", nargs = "+", help = "JSON net files, or directories of them")
+    parser.add_argument("-o", "--output", help = "write the JSON lines to this file instead of stdout")
+    parser.add_argument("-j", "--jobs", type = int, default = 1, help = "number of nets analyzed at the same time, one process each (0: one per CPU)")
+    parser.add_argument("--workers", type = int, default = 1, help = "processes exploring one net, only with --jobs 1. The edges are renumbered in one process, see PetriNetEngine.exploreParallel: --jobs scales better")
+    parser.add_argument("--ts", action = "store_true", help = "also write the states and edges of the transition system")
+    parser.add_argument("--invariants", action = "store_true", help = "also write the P- and T-invariants and the place bounds they prove")
+    parser.add_argument("--siphons", action = "store_true", help = "also write the minimal siphons and traps and the structural deadlock check")
+    parser.add_argument("--liveness", action = "store_true", help = "also write the strongly connected components, reversibility and liveness levels (L0 to L4)")
+    parser.add_argument("--minimize", action = "store_true", help = "also write the size of the graph minimized by bisimulation")
+    parser.add_argument("--hidden", help = "comma separated silent transitions, --minimize then uses branching bisimulation")
+    parser.add_argument("--no-explore", action = "store_true", help = "do not build the reachability graph, i.e: with --invariants or --siphons")
+    parser.add_argument("--names", help = "comma separated places shown in the state labels, all places by default")
+    parser.add_argument("--stubborn", action = "store_true", help = "reduce the graph with stubborn sets, it keeps the deadlocks")
+    parser.add_argument("--max-states", type = int, default = MAX_STATES, help = "stop a net after this number of states, %d by default so that an unbounded net ends (0: no limit)" % MAX_STATES)
+    parser.add_argument("--max-memory", type = int, help = "stop a net when its graph takes about this number of bytes")
+    parser.add_argument("--timeout", type = float, help = "stop a net after this number of seconds")
+    return parser
+
+def main(argv = None) -> int:   # return the exit status, 1 if a net could not be analyzed
+    options = parser().parse_args(argv)
+    jobs = options.jobs if options.jobs > 0 else os.cpu_count()
+    if jobs > 1 and options.workers > 1:
+        parser().error("--workers needs --jobs 1, the processes of the pool can not start their own")
+    files = netFiles(options.paths)
+    output = open(options.output, "w") if options.output else sys.stdout
+    failed = False
+    try:
+        if jobs > 1 and len(files) > 1:
+            pool = multiprocessing.Pool(min(jobs, len(files)))
+            reports = pool.imap(analyzeJob, [(x, options) for x in files])
+        else:
+            pool = None
+            reports = (analyze(x, options) for x in files)
+        for report in reports:  # in the order of the files, each one as soon as it is ready
+            failed = failed or "error" in report
+            output.write(json.dumps(report) + "\n")
+            output.flush()
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
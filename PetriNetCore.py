@@ -0,0 +1,239 @@
+#####################################
+######## Petri Net and Transition System model, independent of pygame
+#### this module never imports pygame, batch jobs and tools import it without a display.
+#### PetriNetGUI subclasses Place, Transition, Arc, State, PetriNet and TransitionSystem to give them rects and draw them
+from PetriNetEngine import CompiledNet, explore, stubbornReport
+from PetriNetSymbolic import SymbolicReachability
+from PetriNetCoverability import coverabilityGraph
+import PetriNetStructure
+import PetriNetLiveness
+import PetriNetBisimulation
+
+#### Place: a place of the Petri Net and the tokens it holds
+class Place:
+    def __init__(self, name, tokens = 0) -> None:
+        self.name = name    # name of the place
+        self.tokens = tokens    # the number of tokens are hold by place
+
+    def copy(self): # return the copy of place
+        return Place(self.name, self.tokens)
+
+#### Transition: a transition of the Petri Net
+class Transition:
+    def __init__(self, name) -> None:
+        self.name = name    # name of the transition
+
+    def copy(self): # return the copy of the transition
+        return Transition(self.name)
+
+#### Arc: an arc of the Petri Net or an edge of the TS
+class Arc:
+    def __init__(self, info) -> None:
+        self.info = info #### info present the information of the Arc, can be a label() or a weight)
+
+    def copy(self):
+        return Arc(self.info)
+
+#### State: a state of the Transition System, named by its marking
+class State:
+    def __init__(self, name, isInit = 0) -> None:
+        self.name = name    # name of the state
+        self.isInit = isInit    # True when "self" is the initial state
+
+    def copy(self): # return the copy of the self object
+        return State(self.name, self.isInit)
+
+#### Petri Net object
+class PetriNet:
+    def __init__(self) -> None:
+        self.places = {}    # a dict map from a name to a place which have that name, i.e: {'a' : Place('a')}
+        self.transitions = {}   # a dict map from a name to a transition which have that name, i.e {'b' : Transition('b')}
+        self.adjList = {}   # a dict which each element is another dict, the adjacent list to store Arc, i.e: {'a' : {'b' : Arc('1')}} mean that an arc points from a to b
+        self.compiled = None    # the CompiledNet (index and weight vectors) of the Petri Net, see compile()
+        self.placeList = []     # places in the order of self.compiled.placeNames
+
+    @classmethod
+    def fromDict(cls, data):    # build a Petri Net from a dict like toDict() returns, i.e: a JSON net file
+        net = cls()             # {'places' : {'free' : 1, 'busy' : 0}, 'transitions' : ['start'], 'arcs' : [['free', 'start', 1], ['start', 'busy', 1]]}
+        for x in data["places"]:
+            net.places[x] = Place(x, int(data["places"][x]))
+        for x in data["transitions"]:
+            if x in net.places:
+                raise ValueError("'%s' is both a place and a transition" % x)
+            net.transitions[x] = Transition(x)
+        for arc in data["arcs"]:
+            source, target = arc[0], arc[1]
+            weight = arc[2] if len(arc) > 2 else 1
+            if not ((source in net.places and target in net.transitions) or (source in net.transitions and target in net.places)):
+                raise ValueError("arc %s -> %s must join a place and a transition" % (source, target))
+            net.addArc(source, target, Arc(str(weight)))
+        return net
+
+    def toDict(self):   # return the places with their tokens, the transitions and the arcs as (source, target, weight), see fromDict()
+        return {"places" : self.markingDict(), "transitions" : list(self.transitions), "arcs" : [[x, y, int(self.adjList[x][y].info)] for x in self.adjList for y in self.adjList[x]]}
+
+    def preset(self, name): # return a dict which is the preset of the 'name'
+        preset = {}
+        if name not in self.adjList:
+            return preset
+        else:
+            for x in self.adjList:
+                if name in self.adjList[x]:
+                    preset[x] = self.adjList[x][name]
+            return preset
+
+    def compile(self):  # return the CompiledNet of the Petri Net, built once and reused until invalidate() is called
+        if self.compiled is None:
+            self.compiled = CompiledNet.fromPetriNet(self)
+            self.placeList = [self.places[x] for x in self.compiled.placeNames]
+        return self.compiled
+
+    def invalidate(self):   # drop the CompiledNet, must be called after places, transitions or adjList are edited directly
+        self.compiled = None
+        self.placeList = []
+
+    def addArc(self, source, target, arc):  # add (or replace) the arc from 'source' to 'target'
+        if source not in self.adjList:
+            self.adjList[source] = {}
+        self.adjList[source][target] = arc
+        self.invalidate()
+
+    def isEnable(self, name) -> bool:   # check if a transition having the 'name' is enable, return True if enable
+        if name not in self.transitions:
+            return False
+        else:
+            compiled = self.compile()
+            for p, w in compiled.pre[compiled.transIndex[name]]:
+                if self.placeList[p].tokens < w:
+                    return False
+            return True
+
+    def firingChanges(self, name):  # return the names of the nodes whose look changes when the transition 'name' fires: its places and the transitions they enable
+        compiled = self.compile()
+        changed = {name}
+        for p, d in compiled.delta[compiled.transIndex[name]]:
+            changed.add(compiled.placeNames[p])
+            changed.update(compiled.transNames[t] for t in compiled.consumers[p])
+        return changed
+
+    def firing(self, name): # firing a transition have the 'name', return True if success
+        if self.isEnable(name):
+            for p, d in self.compiled.delta[self.compiled.transIndex[name]]:
+                self.placeList[p].tokens += d
+            return True
+        else: return False
+
+    def setMarking(self, dict): # set place's tokens with a dict maps from name to the number of tokens, i.e: {'a' : 1, 'b' : 2}
+        for x in dict:
+            self.places[x].tokens = dict[x]
+
+    def markingString(self, names) -> str: # return a string of the marking with 'names' is the list of names of places we need to know, i.e: return '(1,0,0)' with 'names' is ['free', 'busy', 'docu']
+        marking = "("
+        if (len(names) > 0):
+            marking += str(self.places[names[0]].tokens)
+        for i in range(1, len(names)):
+            marking +=  "," + str(self.places[names[i]].tokens)
+        marking += ")"
+        return marking
+
+    def markingDict(self): # return a dict of marking which maps from a name to the number of tokens, i.e: {'free' : 1, 'busy' : 2}
+        dict = {}
+        for x in self.places:
+            dict[x] = self.places[x].tokens
+        return dict
+
+    def copy(self):  # return a copy of the Petri Net, of the same class, with copies of its places, transitions and arcs
+        newPetriNet = type(self)()
+        for x in self.places:
+            newPetriNet.places[x] = self.places[x].copy()
+        for x in self.transitions:
+            newPetriNet.transitions[x] = self.transitions[x].copy()
+        for x in self.adjList:
+            newPetriNet.adjList[x] = {}
+            for y in self.adjList[x]:
+                newPetriNet.adjList[x][y] = self.adjList[x][y].copy()
+        return newPetriNet
+
+    def explore(self, workers = 1, stubborn = False, targets = (), **limits):  # return the compact ReachabilityGraph of the Petri Net from its current marking, using 'workers' processes
+        compiled = self.compile()   # with stubborn = True the graph is reduced, keeping deadlocks and the 'targets' markings (dicts like markingDict())
+        return explore(compiled, compiled.marking(self.markingDict()), workers, stubborn, [compiled.marking(x) for x in targets], **limits)  # limits: see PetriNetEngine.ExplorationBudget
+
+    def reachabilityGraph(self, names, workers = 1, stubborn = False, targets = (), **limits): # return a Transition System which is the reachability graph of the Petri Net
+        return TransitionSystem(self.explore(workers, stubborn, targets, **limits), names)
+
+    def coverabilityGraph(self, maxStates = None, timeout = None):   # return the Karp-Miller CoverabilityGraph of the Petri Net from its current marking, it also terminates on unbounded nets
+        compiled = self.compile()
+        return coverabilityGraph(compiled, compiled.marking(self.markingDict()), maxStates, timeout)
+
+    def symbolicReachability(self):  # return the SymbolicReachability (BDD reachable set) of the Petri Net from its current marking, the net must be 1-safe
+        compiled = self.compile()
+        return SymbolicReachability(compiled, compiled.marking(self.markingDict()))
+
+    def stubbornReport(self, targets = ()):    # return a dict comparing the full and the stubborn set reduced reachability graph, see PetriNetEngine.stubbornReport
+        compiled = self.compile()
+        return stubbornReport(compiled, compiled.marking(self.markingDict()), [compiled.marking(x) for x in targets])
+
+    def pInvariants(self):  # return the minimal support P-invariants as dicts {place : weight}, see PetriNetStructure
+        compiled = self.compile()
+        return [{compiled.placeNames[p] : w for p, w in enumerate(y) if w != 0} for y in PetriNetStructure.pInvariants(compiled)]
+
+    def tInvariants(self):  # return the minimal support T-invariants as dicts {transition : count}
+        compiled = self.compile()
+        return [{compiled.transNames[t] : k for t, k in enumerate(x) if k != 0} for x in PetriNetStructure.tInvariants(compiled)]
+
+    def placeBounds(self):  # return a dict {place : bound}, the P-invariant bound of every place from the current marking, None if no invariant covers it
+        compiled = self.compile()
+        bounds = PetriNetStructure.placeBounds(compiled, compiled.marking(self.markingDict()))
+        return dict(zip(compiled.placeNames, bounds))
+
+    def siphonTrapCheck(self, timeout = None):  # return the structural deadlock pre-check from the current marking with place names, see PetriNetStructure.siphonTrapCheck
+        compiled = self.compile()   # 'deadlockFree' True proves no reachable deadlock without exploring, None is unknown
+        report = PetriNetStructure.siphonTrapCheck(compiled, compiled.marking(self.markingDict()), timeout)
+        for x in ("siphons", "traps", "emptySiphons"):
+            report[x] = [[compiled.placeNames[p] for p in y] for y in report[x]]
+        return report
+
+#### Transition System object
+#### a view over a compact ReachabilityGraph naming every state by the tokens of the places 'names'.
+#### The graph may still be growing in another thread, the view shows its first 'count' states and the out edges of its first 'rows' states,
+#### all the states of the graph unless they are given
+class TransitionSystem:
+    def __init__(self, graph, names, count = None, rows = None) -> None:
+        self.graph = graph  # the ReachabilityGraph shown by the TS
+        self.names = names  # names of the places shown in the state labels, i.e: ('free', 'busy', 'docu')
+        self.initState = graph.label(0, names) # name of the initial state of the TS
+        self.count = len(graph) if count is None else count # number of states shown
+        self.rows = graph.expanded() if rows is None else rows  # number of states whose out edges are shown
+
+    def label(self, i) -> str:  # return the name of state i, i.e: '(1,0,0)'
+        return self.graph.label(i, self.names)
+
+    def state(self, i): # return the State i
+        return State(self.label(i), i==0)
+
+    def successors(self, i):    # return a list of (transition name, target state) for the shown out edges of state i
+        if i >= self.rows:
+            return []
+        transNames = self.graph.net.transNames
+        return [(transNames[t], y) for t, y in self.graph.successors(i) if y < self.count]
+
+    def deadlocks(self):    # return the shown states without out edges
+        return [x for x in self.graph.deadlocks() if x < self.rows]
+
+    def grow(self, count, rows):    # show the states and edges the graph gained
+        self.count = count
+        self.rows = rows
+
+    def liveness(self): # return a dict {transition : level}, the liveness level 0, 1, 3 or 4 of every transition, see PetriNetLiveness.liveness
+        return dict(zip(self.graph.net.transNames, PetriNetLiveness.liveness(self.graph)))
+
+    def behavior(self): # return the components, deadlocks, reversibility and liveness of the whole graph, levels by transition name, see PetriNetLiveness.behavior
+        report = PetriNetLiveness.behavior(self.graph)
+        if report["levels"] is not None:
+            report["levels"] = dict(zip(self.graph.net.transNames, report["levels"]))
+        return report
+
+    def minimize(self, hidden = None):  # return a Transition System of the same class over the bisimulation quotient of the graph, see PetriNetBisimulation.minimize
+        transIndex = self.graph.net.transIndex  # strong bisimulation, or branching bisimulation with the transitions named in 'hidden' silent
+        quotient = PetriNetBisimulation.minimize(self.graph, None if hidden is None else [transIndex[x] for x in hidden])
+        return type(self)(quotient, self.names)
@@ -0,0 +1,99 @@
+#####################################
+######## Karp-Miller coverability graph, terminates on unbounded Petri Nets
+#### a place that can hold arbitrarily many tokens is set to OMEGA (an ω-marking), OMEGA - w and OMEGA + w stay OMEGA
+import math
+import time
+
+OMEGA = math.inf    # the ω value of a place in an ω-marking
+
+#### CoverabilityGraph: the nodes are ω-markings, a node is never created twice for the same ω-marking
+#### for a bounded net the graph is exactly the reachability graph
+class CoverabilityGraph:
+    def __init__(self, net) -> None:
+        self.net = net  # the CompiledNet the graph was built from
+        self.markings = []  # node index -> ω-marking vector, the initial marking is node 0
+        self.index = {}     # ω-marking vector -> node index
+        self.parent = []    # node index -> node it was first reached from, -1 for the initial node
+        self.edges = []     # node index -> list of (transition index, target node index)
+        self.truncated = False  # True if the build stopped on its state or time budget, the graph is then incomplete
+
+    def __len__(self) -> int:
+        return len(self.markings)
+
+    def bounds(self):   # return the largest number of tokens of every place, OMEGA for the unbounded places,
+        bounds = [0]*len(self.net.placeNames)   # None for the others when the graph is truncated: a missing node may hold more
+        for marking in self.markings:
+            for p in range(len(marking)):
+                if marking[p] > bounds[p]: bounds[p] = marking[p]
+        if self.truncated:
+            return [x if x == OMEGA else None for x in bounds]
+        return bounds
+
+    def boundedness(self):  # return a dict {place name : True if the place is bounded}, None if the truncated graph does not tell
+        return {self.net.placeNames[p] : None if x is None else x != OMEGA for p, x in enumerate(self.bounds())}
+
+    def isBounded(self):    # return True if every place is bounded, False if one is not, None if the truncated graph does not tell
+        bounds = self.bounds()
+        if OMEGA in bounds:
+            return False
+        return None if self.truncated else True
+
+    def covers(self, marking):  # True if some reachable marking is greater or equal to 'marking' on every place, None instead of False when truncated
+        if any(all(m[p] >= marking[p] for p in range(len(m))) for m in self.markings):
+            return True
+        return None if self.truncated else False
+
+    def minimalCoverabilitySet(self):  # return the maximal ω-markings of the graph, an antichain whose downward closure is the coverability set
+        result = []
+        omegas = lambda x: (sum(1 for v in x if v == OMEGA), sum(v for v in x if v != OMEGA))   # a marking covering another one comes before it
+        for m in sorted(set(self.markings), key = omegas, reverse = True):
+            if not any(all(x[p] >= m[p] for p in range(len(m))) for x in result):
+                result.append(m)
+        return result
+
+#### fire transition t of 'net' from the ω-marking 'marking', t must be enabled (OMEGA covers every weight)
+def fireOmega(net, marking, t):
+    successor = list(marking)
+    for p, d in net.delta[t]:
+        if successor[p] != OMEGA:
+            successor[p] += d
+    return successor
+
+#### build the Karp-Miller coverability graph of 'net' (a CompiledNet) from the marking vector 'marking'
+#### when a new marking strictly covers one of its ancestors, the places that grew are accelerated to OMEGA.
+#### The build stops early, with truncated = True, after 'maxStates' nodes or 'timeout' seconds (None means no limit)
+def coverabilityGraph(net, marking, maxStates = None, timeout = None):
+    graph = CoverabilityGraph(net)
+    start = time.monotonic()
+    graph.markings.append(tuple(marking))
+    graph.index[tuple(marking)] = 0
+    graph.parent.append(-1)
+    graph.edges.append([])
+    s = 0
+    while s < len(graph.markings):
+        if (maxStates is not None and len(graph.markings) >= maxStates) or (timeout is not None and time.monotonic() - start > timeout):
+            graph.truncated = True
+            break
+        current = graph.markings[s]
+        for t in range(len(net.transNames)):
+            if not all(current[p] >= w for p, w in net.pre[t]):
+                continue
+            successor = fireOmega(net, current, t)
+            a = s
+            while a != -1:  # accelerate against every ancestor the successor covers
+                ancestor = graph.markings[a]
+                if all(successor[p] >= ancestor[p] for p in range(len(successor))):
+                    for p in range(len(successor)):
+                        if successor[p] > ancestor[p]: successor[p] = OMEGA
+                a = graph.parent[a]
+            successor = tuple(successor)
+            target = graph.index.get(successor)
+            if target is None:
+                target = len(graph.markings)
+                graph.index[successor] = target
+                graph.markings.append(successor)
+                graph.parent.append(s)
+                graph.edges.append([])
+            graph.edges[s].append((t, target))
+        s += 1
+    return graph
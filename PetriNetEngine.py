@@ -0,0 +1,663 @@
+#####################################
+######## compiled form of a Petri Net, independent of pygame
+#### places and transitions are numbered once, arcs become sparse pre/post weight vectors,
+#### so checking and firing a transition only touches the places around it
+from array import array
+from collections import OrderedDict
+import multiprocessing
+import sys
+import threading
+import time
+
+#### CompiledNet: integer indices and pre/post/delta vectors of a Petri Net
+class CompiledNet:
+    def __init__(self, placeNames, transNames, arcs) -> None:  # arcs is an iterable of (source name, target name, weight)
+        self.placeNames = list(placeNames)  # place index -> name, i.e: ['free', 'busy', 'docu']
+        self.transNames = list(transNames)  # transition index -> name, i.e: ['start', 'change', 'end']
+        self.placeIndex = {name : i for i, name in enumerate(self.placeNames)}  # name -> place index
+        self.transIndex = {name : i for i, name in enumerate(self.transNames)}  # name -> transition index
+        self.pre = [() for t in self.transNames]     # pre[t] is a tuple of (place index, weight) consumed by t
+        self.post = [() for t in self.transNames]    # post[t] is a tuple of (place index, weight) produced by t
+        self.delta = [() for t in self.transNames]   # delta[t] is a tuple of (place index, change), only non-zero changes
+        self.watch = [[] for p in self.placeNames]  # watch[p] lists the transitions that can only be enabled when place p is marked
+        self.sources = []   # transitions with an empty preset, enabled in every marking
+        self.consumers = [[] for p in self.placeNames]  # consumers[p] lists the transitions with p in their preset
+        self.increasers = [[] for p in self.placeNames] # increasers[p] lists the transitions that add tokens to p
+        self.decreasers = [[] for p in self.placeNames] # decreasers[p] lists the transitions that remove tokens from p
+        self.key = None # hashable form of the places, transitions and arcs, see structure()
+        pre = [{} for t in self.transNames]
+        post = [{} for t in self.transNames]
+        for source, target, weight in arcs:
+            if weight < 1:  # a weight of 0 would be watched but never needed, a negative one makes tokens out of nothing
+                raise ValueError("arc %r -> %r has weight %r, it must be at least 1" % (source, target, weight))
+            if source in self.placeIndex and target in self.transIndex:
+                p, t = self.placeIndex[source], self.transIndex[target]
+                pre[t][p] = pre[t].get(p, 0) + weight
+            elif source in self.transIndex and target in self.placeIndex:
+                t, p = self.transIndex[source], self.placeIndex[target]
+                post[t][p] = post[t].get(p, 0) + weight
+            else:
+                raise ValueError("arc %r -> %r must join a place and a transition" % (source, target))
+        for t in range(len(self.transNames)):
+            self.pre[t] = tuple(sorted(pre[t].items()))
+            self.post[t] = tuple(sorted(post[t].items()))
+            change = dict(post[t])
+            for p, w in pre[t].items():
+                change[p] = change.get(p, 0) - w
+            self.delta[t] = tuple(sorted((p, d) for p, d in change.items() if d != 0))
+            for p, w in self.pre[t]:
+                self.consumers[p].append(t)
+            for p, d in self.delta[t]:
+                if d > 0: self.increasers[p].append(t)
+                else: self.decreasers[p].append(t)
+            if len(self.pre[t]) > 0:    # watch the input place needing the most tokens
+                self.watch[max(self.pre[t], key = lambda x: x[1])[0]].append(t)
+            else:
+                self.sources.append(t)
+
+    @classmethod
+    def fromPetriNet(cls, net):    # compile a PetriNet, parsing every arc weight (Arc.info) exactly once
+        arcs = []
+        for x in net.adjList:
+            for y in net.adjList[x]:
+                arcs.append((x, y, int(net.adjList[x][y].info)))
+        return cls(net.places.keys(), net.transitions.keys(), arcs)
+
+    def structure(self):    # return a hashable key, equal for two nets with the same places, transitions and arcs
+        if self.key is None:
+            self.key = (tuple(self.placeNames), tuple(self.transNames), tuple(self.pre), tuple(self.post))
+        return self.key
+
+    def marking(self, dict) -> tuple:   # convert a dict {name : tokens} to a marking vector, missing places hold 0 tokens
+        return tuple(dict.get(x, 0) for x in self.placeNames)
+
+    def markingDict(self, marking): # convert a marking vector back to a dict {name : tokens}
+        return dict(zip(self.placeNames, marking))
+
+    def isEnabled(self, marking, t) -> bool:    # True if transition index t is enabled in the marking vector
+        for p, w in self.pre[t]:
+            if marking[p] < w:
+                return False
+        return True
+
+    def enabled(self, marking):   # return the list of transition indices enabled in the marking vector
+        return [t for t in range(len(self.pre)) if self.isEnabled(marking, t)]
+
+    def fire(self, marking, t) -> tuple:    # return the marking vector reached by firing t, t must be enabled
+        successor = list(marking)
+        for p, d in self.delta[t]:
+            successor[p] += d
+        return tuple(successor)
+
+#### MarkingStore: visited set of markings, every marking is packed into one int with a fixed-width field per place
+#### the top bit of every field is a guard bit, so a whole marking can be compared and updated with a few int operations:
+#### 'marking >= pre' is ((packed | guard) - pre) & guard == guard, firing is packed - pre + post
+class MarkingStore:
+    def __init__(self, size, bits = 8) -> None:
+        self.size = size    # number of places in a marking
+        self.bits = bits    # width of one field, including its guard bit
+        self.packed = []    # state index -> packed marking
+        self.index = {}     # hash index, packed marking -> state index
+        self.setBits(bits)
+
+    def setBits(self, bits):    # set the field width and the masks that depend on it
+        self.bits = bits
+        self.limit = 1 << (bits - 1)    # every field holds a value in 0 .. limit-1
+        self.guard = 0  # the guard bit of every field
+        self.ones = 0   # the value 1 in every field
+        for p in range(self.size):
+            self.guard |= self.limit << (p*bits)
+            self.ones |= 1 << (p*bits)
+
+    def __len__(self) -> int:
+        return len(self.packed)
+
+    def fits(self, value) -> bool:  # True if 'value' tokens fit in one field
+        return value < self.limit
+
+    def pack(self, marking) -> int: # pack a marking vector, every value must fit in a field
+        value = 0
+        for p in range(self.size - 1, -1, -1):
+            value = (value << self.bits) | marking[p]
+        return value
+
+    def unpack(self, value) -> tuple:   # unpack a packed marking to a marking vector
+        mask = (1 << self.bits) - 1
+        marking = []
+        for p in range(self.size):
+            marking.append(value & mask)
+            value >>= self.bits
+        return tuple(marking)
+
+    def packSparse(self, vector) -> int:    # pack a sparse vector of (place index, weight), i.e: CompiledNet.pre[t]
+        value = 0
+        for p, w in vector:
+            value += w << (p*self.bits)
+        return value
+
+    def add(self, marking): # add a marking vector, return (state index, True if the marking is new)
+        while max(marking, default = 0) >= self.limit:
+            self.widen()
+        return self.addPacked(self.pack(marking))
+
+    def addPacked(self, value): # add a packed marking, return (state index, True if the marking is new)
+        s = self.index.get(value)
+        if s is not None:
+            return s, False
+        s = len(self.packed)
+        self.index[value] = s
+        self.packed.append(value)
+        return s, True
+
+    def find(self, marking):    # return the state index of a marking vector, None if it is not stored
+        if max(marking, default = 0) >= self.limit:
+            return None
+        return self.index.get(self.pack(marking))
+
+    def marking(self, s) -> tuple:  # decode the marking vector of state s
+        return self.unpack(self.packed[s])
+
+    def widen(self):    # double the field width and re-pack every stored marking, state indices are kept
+        markings = [self.unpack(x) for x in self.packed]
+        self.setBits(2*self.bits)
+        self.packed = [self.pack(x) for x in markings]
+        self.index = {x : s for s, x in enumerate(self.packed)}
+
+#### ReachabilityGraph: compact reachability graph, no widget is created for a state
+#### states are numbered in BFS order and stored in a MarkingStore, edges are stored in CSR form:
+#### the out edges of state s are edges offsets[s] .. offsets[s+1]-1, edge e goes to targets[e] by firing labels[e]
+class ReachabilityGraph:
+    def __init__(self, net, store) -> None:
+        self.net = net  # the CompiledNet the graph was built from
+        self.store = store  # the MarkingStore of the states, the initial state is index 0
+        self.offsets = array('l', [0])  # CSR row offsets, one more than the number of expanded states
+        self.targets = array('l')   # target state index of every edge
+        self.labels = array('l')    # transition index of every edge
+        self.reduced = False    # True if the graph was built with stubborn sets, it then only keeps some interleavings
+        self.skipped = 0    # number of enabled transitions not fired because they were outside the stubborn set
+        self.truncated = False  # True if the build stopped early, only the first expanded() states then have their out edges
+        self.stopReason = ""    # why the build stopped early: 'states', 'memory', 'time' or 'cancelled'
+        self.lock = threading.Lock()    # held while the store is re-packed, so another thread can decode markings during the build
+
+    def __len__(self) -> int:   # number of states
+        return len(self.store)
+
+    def expanded(self) -> int:  # number of states whose out edges are known, the others are the unexplored frontier
+        return len(self.offsets) - 1
+
+    def memory(self) -> int:    # estimated size in bytes of the states and edges
+        store = self.store
+        size = sys.getsizeof(store.index) + sys.getsizeof(store.packed)
+        if len(store.packed) > 0:
+            size += len(store.packed)*sys.getsizeof(store.packed[-1])
+        for x in (self.offsets, self.targets, self.labels):
+            size += x.buffer_info()[1]*x.itemsize
+        return size
+
+    def numEdges(self) -> int:
+        return len(self.targets)
+
+    def successors(self, s):    # return a list of (transition index, target state index) for the out edges of state s
+        if s + 1 >= len(self.offsets):
+            return []
+        return [(self.labels[e], self.targets[e]) for e in range(self.offsets[s], self.offsets[s + 1])]
+
+    def edges(self, rows = None, count = None):  # return the (source, target) pairs of the out edges of the first 'rows' states, targets below 'count'
+        rows = self.expanded() if rows is None else rows
+        count = len(self) if count is None else count
+        offsets, targets = self.offsets, self.targets
+        return [(s, targets[e]) for s in range(rows) for e in range(offsets[s], offsets[s + 1]) if targets[e] < count]
+
+    def deadlocks(self):    # return the expanded states without out edges
+        offsets = self.offsets
+        return [s for s in range(self.expanded()) if offsets[s] == offsets[s + 1]]
+
+    def marking(self, s) -> tuple:  # marking vector of state s, decoded on demand
+        with self.lock:
+            return self.store.marking(s)
+
+    def find(self, marking):    # state index of a marking vector, None if it is not reachable
+        return self.store.find(tuple(marking))
+
+    def label(self, s, names) -> str:   # display string of state s, i.e: '(1,0,0)' with 'names' is ['free', 'busy', 'docu']
+        marking = self.marking(s)
+        return "(" + ",".join(str(marking[self.net.placeIndex[x]]) for x in names) + ")"
+
+#### ExplorationProgress: what a progress callback of explore receives
+class ExplorationProgress:
+    def __init__(self, graph, elapsed) -> None:
+        self.states = len(graph)    # states found so far
+        self.edges = graph.numEdges()   # edges found so far
+        self.frontier = len(graph) - graph.expanded()   # states found but not expanded yet
+        self.elapsed = elapsed  # seconds since the build started
+        self.statesPerSecond = self.states/elapsed if elapsed > 0 else 0.0
+        self.graph = graph  # the partial graph, its first 'expanded' states are complete
+
+#### ExplorationBudget: limits of an exploration, checked by the exploration loops between two states
+#### maxStates, maxMemory (bytes, see ReachabilityGraph.memory) and timeout (seconds) are None for no limit,
+#### progress is called with an ExplorationProgress at the first check and then every 'interval' seconds,
+#### cancel is any object with is_set(), i.e: a threading.Event
+class ExplorationBudget:
+    def __init__(self, maxStates = None, maxMemory = None, timeout = None, progress = None, cancel = None, interval = 0.5) -> None:
+        self.maxStates = maxStates
+        self.maxMemory = maxMemory
+        self.timeout = timeout
+        self.progress = progress
+        self.cancel = cancel
+        self.interval = interval
+        self.start = time.monotonic()
+        self.lastReport = None  # time of the last progress report
+        self.memoryCheck = 0    # number of states at the last memory estimate, the estimate is redone every 1024 states
+
+    def check(self, graph) -> bool: # return False, and mark 'graph' as truncated, if the exploration must stop now
+        now = time.monotonic()
+        reason = ""
+        if self.cancel is not None and self.cancel.is_set():
+            reason = "cancelled"
+        elif self.maxStates is not None and len(graph) >= self.maxStates:
+            reason = "states"
+        elif self.timeout is not None and now - self.start > self.timeout:
+            reason = "time"
+        elif self.maxMemory is not None and len(graph) - self.memoryCheck >= 1024:
+            self.memoryCheck = len(graph)
+            if graph.memory() > self.maxMemory:
+                reason = "memory"
+        if self.progress is not None and (reason != "" or self.lastReport is None or now - self.lastReport >= self.interval):
+            self.lastReport = now
+            self.progress(ExplorationProgress(graph, now - self.start))
+        if reason != "":
+            graph.truncated = True
+            graph.stopReason = reason
+            return False
+        return True
+
+    def finish(self, graph):    # report the final progress of a complete exploration
+        if self.progress is not None:
+            self.progress(ExplorationProgress(graph, time.monotonic() - self.start))
+
+#### smallest field width (at least 8 bits) holding twice the largest token count or arc weight of the net
+def fieldBits(net, marking) -> int:
+    largest = max(marking, default = 0)
+    for t in range(len(net.transNames)):
+        for p, w in net.pre[t] + net.post[t]:
+            largest = max(largest, w)
+    bits = 8
+    while (1 << (bits - 1)) <= 2*largest:
+        bits *= 2
+    return bits
+
+#### return the sorted list of transition indices enabled in the packed marking 'packed'
+#### only the transitions watching a marked place are checked, 'pre' are the packed presets of the transitions
+def packedEnabled(net, store, pre, packed):
+    guard = store.guard
+    marked = ((packed | guard) - store.ones) & guard    # guard bit of every marked place
+    enabled = [t for t in net.sources]
+    while marked:
+        bit = marked & -marked
+        marked ^= bit
+        for t in net.watch[(bit.bit_length() - 1)//store.bits]:
+            if ((packed | guard) - pre[t]) & guard == guard:
+                enabled.append(t)
+    enabled.sort()
+    return enabled
+
+#### return the sorted enabled transitions of a stubborn set of 'marking' (a marking vector), 'enabled' are all enabled transitions
+#### the set is closed under: an enabled member brings every transition it can disable or be disabled by,
+#### a disabled member brings every transition that adds tokens to one of the places keeping it disabled.
+#### Firing only such a set keeps every deadlock. For each marking of 'targets' not equal to 'marking', the set also contains
+#### the transitions that move one differing place towards the target, so no path to a target is lost
+def stubbornSet(net, marking, enabled, targets = ()):
+    isEnabled = set(enabled)
+    upset = []
+    for target in targets:
+        best = None
+        for p in range(len(marking)):
+            if marking[p] < target[p]: candidates = net.increasers[p]
+            elif marking[p] > target[p]: candidates = net.decreasers[p]
+            else: continue
+            if best is None or len(candidates) < len(best): best = candidates
+        if best is not None: upset.extend(best)
+    smallest = enabled
+    for seed in enabled:
+        inside = set(upset)
+        inside.add(seed)
+        work = list(inside)
+        while len(work) > 0:
+            t = work.pop()
+            if t in isEnabled:
+                added = [x for p, d in net.delta[t] if d < 0 for x in net.consumers[p]]
+                added += [x for p, w in net.pre[t] for x in net.decreasers[p]]
+            else:
+                added = min((net.increasers[p] for p, w in net.pre[t] if marking[p] < w), key = len)
+            for x in added:
+                if x not in inside:
+                    inside.add(x)
+                    work.append(x)
+            if len(inside) >= len(net.transNames): break
+        fired = sorted(x for x in inside if x in isEnabled)
+        if len(fired) < len(smallest):
+            smallest = fired
+            if len(smallest) == 1: break
+    return smallest
+
+#### explore 'net' from 'marking' both fully and with stubborn sets, return a dict of the state and edge counts of both
+#### and the number of states the reduction pruned
+def stubbornReport(net, marking, targets = ()):
+    full = explore(net, marking)
+    reduced = explore(net, marking, stubborn = True, targets = targets)
+    return {"states" : len(full), "edges" : full.numEdges(), "reducedStates" : len(reduced), "reducedEdges" : reduced.numEdges(), "pruned" : len(full) - len(reduced), "skipped" : reduced.skipped}
+
+#### build the reachability graph of 'net' (a CompiledNet) from the marking vector 'marking' by BFS
+#### states are numbered in the order they are found, so the frontier is just the states after the last expanded one
+#### with workers > 1 the work is spread over that many processes (see exploreParallel and its LIMIT), the result is the same
+#### with stubborn = True only a stubborn set of the enabled transitions is fired in every state (see stubbornSet):
+#### all deadlocks are kept, and every marking of 'targets' (marking vectors) that is reachable is kept as well
+#### the other keywords are the limits of an ExplorationBudget, when one is hit the partial graph is returned with truncated = True
+def explore(net, marking, workers = 1, stubborn = False, targets = (), **limits):
+    budget = ExplorationBudget(**limits)
+    if stubborn and workers > 1:
+        raise ValueError("stubborn set reduction only runs in a single process")
+    if workers > 1:
+        return exploreParallel(net, marking, workers, budget)
+    marking = tuple(marking)
+    targets = [tuple(x) for x in targets]
+    store = MarkingStore(len(net.placeNames), fieldBits(net, marking))
+    graph = ReachabilityGraph(net, store)
+    graph.reduced = stubborn
+    store.add(marking)
+    pre = [store.packSparse(x) for x in net.pre]
+    post = [store.packSparse(x) for x in net.post]
+    s = 0   # next state to expand
+    while s < len(store):
+        if not budget.check(graph):
+            return graph
+        popmark = store.packed[s]
+        enabled = packedEnabled(net, store, pre, popmark)
+        if stubborn and len(enabled) > 1:
+            fired = stubbornSet(net, store.unpack(popmark), enabled, targets)
+            graph.skipped += len(enabled) - len(fired)
+            enabled = fired
+        for t in enabled:
+            successor = popmark - pre[t] + post[t]
+            while successor & store.guard:  # a place went past the field width
+                with graph.lock:
+                    store.widen()
+                pre = [store.packSparse(x) for x in net.pre]
+                post = [store.packSparse(x) for x in net.post]
+                popmark = store.packed[s]
+                successor = popmark - pre[t] + post[t]
+            graph.targets.append(store.addPacked(successor)[0])
+            graph.labels.append(t)
+        graph.offsets.append(len(graph.targets))
+        s += 1
+    budget.finish(graph)
+    return graph
+
+#### return the part of the complete graph 'graph' reachable from its state s, as a ReachabilityGraph whose initial state is s.
+#### States are numbered in BFS order from s with edges in their stored order, so the result is the graph explore() builds from that marking.
+#### 'limits' are those of explore (see ExplorationBudget), the result is truncated like an exploration when they stop it
+def reachableSubgraph(graph, s, **limits):
+    budget = ExplorationBudget(**limits)
+    store = MarkingStore(len(graph.net.placeNames), graph.store.bits)
+    sub = ReachabilityGraph(graph.net, store)
+    packed = graph.store.packed
+    offsets, targets, labels = graph.offsets, graph.targets, graph.labels
+    old = [s]   # state of sub -> state of graph
+    store.addPacked(packed[s])
+    x = 0
+    while x < len(old):
+        if not budget.check(sub):
+            return sub
+        for e in range(offsets[old[x]], offsets[old[x] + 1]):
+            y, new = store.addPacked(packed[targets[e]])
+            if new:
+                old.append(targets[e])
+            sub.targets.append(y)
+            sub.labels.append(labels[e])
+        sub.offsets.append(len(sub.targets))
+        x += 1
+    budget.finish(sub)
+    return sub
+
+#### ReachabilityCache: LRU cache of complete, unreduced reachability graphs keyed by (net structure, initial marking).
+#### An initial marking that is a state of a cached graph of the same net is answered with its reachableSubgraph, without
+#### exploring. When more than 'capacity' graphs are kept the least recently used one is dropped
+class ReachabilityCache:
+    def __init__(self, capacity = 8) -> None:
+        self.capacity = capacity
+        self.graphs = OrderedDict() # (structure, marking) -> ReachabilityGraph, least recently used first
+        self.lock = threading.Lock()    # graphs may be put by a build thread
+        self.hits = 0   # lookups answered by a cached graph
+        self.subgraphs = 0  # lookups answered by the subgraph of a cached graph
+        self.misses = 0 # lookups that need an exploration
+
+    def __len__(self) -> int:
+        return len(self.graphs)
+
+    def get(self, net, marking, **limits):  # return the graph of the CompiledNet 'net' from the marking vector 'marking', None if it must be explored
+                                            # 'limits' bound the build of a subgraph, see reachableSubgraph
+        key = (net.structure(), tuple(marking))
+        with self.lock:
+            graph = self.graphs.get(key)
+            if graph is not None:
+                self.graphs.move_to_end(key)
+                self.hits += 1
+                return graph
+            found = None
+            for (structure, initial), cached in reversed(self.graphs.items()):  # most recently used first
+                if structure == key[0]:
+                    s = cached.find(key[1])
+                    if s is not None:
+                        found = (cached, s)
+                        break
+            if found is None:
+                self.misses += 1
+                return None
+            self.subgraphs += 1
+        graph = reachableSubgraph(*found, **limits)
+        self.put(net, marking, graph)
+        return graph
+
+    def put(self, net, marking, graph): # remember the graph of 'net' from 'marking', truncated and reduced graphs are not kept
+        if graph.truncated or graph.reduced:
+            return
+        key = (net.structure(), tuple(marking))
+        with self.lock:
+            self.graphs[key] = graph
+            self.graphs.move_to_end(key)
+            while len(self.graphs) > self.capacity:
+                self.graphs.popitem(last = False)
+
+    def explore(self, net, marking, workers = 1, **limits): # explore() through the cache, a new complete graph is kept
+        graph = self.get(net, marking, **limits)
+        if graph is None:
+            graph = explore(net, marking, workers, **limits)
+            self.put(net, marking, graph)
+        return graph
+
+#### one worker of exploreParallel: owns the states whose packed marking hashes to 'rank', talks to the coordinator through 'conn'
+#### commands: ("add", packed list) -> number of new states,
+#### ("expand",) -> "overflow" or (successors grouped by owner, number of edges, number of states expanded),
+#### ("widen",) -> None, ("result",) -> (owned expanded packed markings, out edges of each of them as (transition, packed target))
+def exploreWorker(conn, net, bits, rank, workers):
+    store = MarkingStore(len(net.placeNames), bits)
+    edges = []  # local state index -> list of (transition index, packed target), empty for the frontier
+    frontier = []   # local states not expanded yet
+    pending = None  # out edges of the frontier found by the last expand, kept by the next add and dropped by widen
+    pre = [store.packSparse(x) for x in net.pre]
+    post = [store.packSparse(x) for x in net.post]
+    while True:
+        command = conn.recv()
+        if command[0] == "add":     # the coordinator accepted the last level: keep its edges, the added states are the next frontier
+            if pending is not None:
+                for s, out in zip(frontier, pending):
+                    edges[s] = out
+                frontier = []
+                pending = None
+            added = 0
+            for x in command[1]:
+                s, isNew = store.addPacked(x)
+                if isNew:
+                    edges.append([])
+                    frontier.append(s)
+                    added += 1
+            conn.send(added)
+        elif command[0] == "expand":    # the level is only kept by the next add, another worker may overflow
+            found = [set() for i in range(workers)]
+            level = []
+            overflow = False
+            for s in frontier:
+                popmark = store.packed[s]
+                out = []
+                for t in packedEnabled(net, store, pre, popmark):
+                    successor = popmark - pre[t] + post[t]
+                    if successor & store.guard:
+                        overflow = True
+                        break
+                    out.append((t, successor))
+                    found[hash(successor) % workers].add(successor)
+                if overflow: break
+                level.append(out)
+            if overflow:
+                pending = None
+                conn.send("overflow")
+            else:
+                pending = level
+                conn.send(([list(x) for x in found], sum(len(x) for x in level), len(frontier)))
+        elif command[0] == "widen": # the owner of a state depends on its packing, reply the states now owned by other workers
+            pending = None
+            edges = [[(t, store.unpack(x)) for t, x in out] for out in edges]
+            store.widen()
+            edges = [[(t, store.pack(x)) for t, x in out] for out in edges]
+            pre = [store.packSparse(x) for x in net.pre]
+            post = [store.packSparse(x) for x in net.post]
+            waiting = set(frontier)
+            kept = MarkingStore(store.size, store.bits)
+            keptEdges = []
+            keptFrontier = []
+            moved = []  # (packed marking, out edges, True if not expanded yet)
+            for s, x in enumerate(store.packed):
+                if hash(x) % workers == rank:
+                    if s in waiting: keptFrontier.append(len(keptEdges))
+                    kept.addPacked(x)
+                    keptEdges.append(edges[s])
+                else:
+                    moved.append((x, edges[s], s in waiting))
+            store, edges, frontier = kept, keptEdges, keptFrontier
+            conn.send(moved)
+        elif command[0] == "adopt": # states moved here by a widen
+            for x, out, waiting in command[1]:
+                s, isNew = store.addPacked(x)
+                edges.append(out)
+                if waiting: frontier.append(s)
+            conn.send(None)
+        elif command[0] == "result":    # only the expanded states
+            waiting = set(frontier)
+            done = [s for s in range(len(store.packed)) if s not in waiting]
+            conn.send(([store.packed[s] for s in done], [edges[s] for s in done]))
+        else:
+            break
+
+#### ParallelStatus: counters of a running exploreParallel, it stands for the graph when the ExplorationBudget is checked
+class ParallelStatus:
+    def __init__(self, bytesPerState) -> None:
+        self.states = 0
+        self.edges = 0
+        self.expandedStates = 0
+        self.bytesPerState = bytesPerState  # estimated size of one stored state, summed over all workers
+        self.truncated = False
+        self.stopReason = ""
+
+    def __len__(self) -> int:
+        return self.states
+
+    def numEdges(self) -> int:
+        return self.edges
+
+    def expanded(self) -> int:
+        return self.expandedStates
+
+    def memory(self) -> int:
+        return self.states*self.bytesPerState + self.edges*16
+
+#### parallel version of explore: the states are partitioned by hash over 'workers' processes, which expand one BFS level at a time
+#### and send the successors they find to their owners; the result is renumbered exactly as explore numbers it.
+#### A level is two-phase: the workers keep their frontier until every one of them expanded it without overflowing a field,
+#### otherwise they all widen, hand over the states whose owner changed with the packing, and expand the level again.
+#### The 'budget' (an ExplorationBudget) is checked between two levels, a truncated result holds the levels expanded so far.
+#### LIMIT: the successors of every level go through this process to reach their owners, and the final renumbering gathers every
+#### edge here and looks up every target again in one store. That serial part alone costs over half a sequential explore, so the
+#### speedup stays below 2 however many workers are used: more workers only help when firing transitions dominates
+def exploreParallel(net, marking, workers, budget):
+    marking = tuple(marking)
+    store = MarkingStore(len(net.placeNames), fieldBits(net, marking))
+    while max(marking, default = 0) >= store.limit:
+        store.widen()
+    status = ParallelStatus(120 + store.bits*store.size//8)
+    conns = []
+    processes = []
+    for rank in range(workers):
+        conn, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target = exploreWorker, args = (child, net, store.bits, rank, workers), daemon = True)
+        process.start()
+        conns.append(conn)
+        processes.append(process)
+    try:
+        initial = store.pack(marking)
+        conns[hash(initial) % workers].send(("add", [initial]))
+        status.states = conns[hash(initial) % workers].recv()
+        while budget.check(status):
+            for conn in conns:
+                conn.send(("expand",))
+            replies = [conn.recv() for conn in conns]
+            if "overflow" in replies:   # every worker has to use the same field width, the level is expanded again after it
+                for conn in conns:
+                    conn.send(("widen",))
+                owned = [[] for rank in range(workers)]
+                for conn in conns:
+                    for x in conn.recv():
+                        owned[hash(x[0]) % workers].append(x)
+                for rank in range(workers):
+                    conns[rank].send(("adopt", owned[rank]))
+                for conn in conns:
+                    conn.recv()
+                store.widen()
+                status.bytesPerState = 120 + store.bits*store.size//8
+                continue
+            for found, edges, expanded in replies:
+                status.edges += edges
+                status.expandedStates += expanded
+            for rank in range(workers):
+                conns[rank].send(("add", [x for found, edges, expanded in replies for x in found[rank]]))
+            added = sum(conn.recv() for conn in conns)
+            status.states += added
+            if added == 0:
+                break
+        out = {}    # packed marking -> list of (transition index, packed target)
+        for conn in conns:
+            conn.send(("result",))
+        for conn in conns:
+            packed, edges = conn.recv()
+            out.update(zip(packed, edges))
+        for conn in conns:
+            conn.send(("stop",))
+    finally:
+        for process in processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+    initial = store.pack(marking)
+    graph = ReachabilityGraph(net, store)
+    graph.truncated = status.truncated
+    graph.stopReason = status.stopReason
+    store.addPacked(initial)
+    s = 0
+    while s < len(store) and store.packed[s] in out:
+        for t, x in out[store.packed[s]]:
+            graph.targets.append(store.addPacked(x)[0])
+            graph.labels.append(t)
+        graph.offsets.append(len(graph.targets))
+        s += 1
+    if not graph.truncated:
+        budget.finish(graph)
+    return graph
@@ -2,6 +2,12 @@
 import pygame
 import math
 import random
+import threading
+from array import array
+from collections import OrderedDict
+import PetriNetCore
+from PetriNetEngine import explore, ExplorationProgress, ReachabilityCache
+from PetriNetLayout import layeredLayout, forceLayout
  
 WIDTH = 1200
 HEIGHT = 650
@@ -18,30 +24,115 @@ GRAY = (150, 150, 150)
 LIGHTGRAY = (211,211,211)
 LIGHTRED = (255, 204, 203)
 YELLOW = (255, 255, 0)
+LODSIZE = 12    # below this node width in pixels a TS is drawn as dots and lines, without labels and arrowheads
+CLUSTERLIMIT = 3000 # above this number of visible states a TS is drawn as clusters, one square per cell of CLUSTERCELL to 2*CLUSTERCELL pixels
+CLUSTERCELL = 10
+CLUSTERLINKS = 20000   # clusters are linked only when the shown states have at most this number of edges
+MINZOOM = 0.25
+MAXZOOM = 400
+FPS = 60    # frame rate of the main loop while the mouse drags a node or the camera, it sleeps in pygame.event.wait otherwise
+CACHESIZE = 8   # number of reachability graphs kept by reachabilityCache for the next SET
+BUILDWAIT = 100 # longest wait for an event in milliseconds while a background build runs, its new states are shown at least this often
 
 #####################################
 ######## algorithms and data structures to present Petri Net and Transition System
 
+#### FontCache: process-wide LRU cache of pygame fonts and rendered texts, so that a frame does not create fonts again.
+#### fonts are keyed by (face, size), rendered texts by (face, size, text, color), the best size fitting a box by (face, max size, text, width, height).
+#### When a table is full the least recently used entry is dropped
+class FontCache:
+    def __init__(self, maxFonts = 64, maxTexts = 2048, maxFits = 4096) -> None:
+        self.fonts = OrderedDict()  # (face, size) -> pygame font
+        self.texts = OrderedDict()  # (face, size, text, color) -> rendered surface
+        self.fits = OrderedDict()   # (face, max size, text, width, height) -> font size
+        self.maxFonts = maxFonts
+        self.maxTexts = maxTexts
+        self.maxFits = maxFits
+
+    def lookup(self, table, key, limit, create):    # return table[key], creating it and evicting the oldest entry when missing
+        value = table.get(key)
+        if value is None:
+            value = create()
+            table[key] = value
+            if len(table) > limit:
+                table.popitem(last = False)
+        else:
+            table.move_to_end(key)
+        return value
+
+    def font(self, size, face = "sans"):
+        return self.lookup(self.fonts, (face, size), self.maxFonts, lambda: pygame.font.SysFont(face, size))
+
+    def render(self, text, size, color = BLACK, face = "sans"):  # return the surface of 'text' rendered at 'size' in 'color'
+        return self.lookup(self.texts, (face, size, text, tuple(color)), self.maxTexts, lambda: self.font(size, face).render(text, True, color))
+
+    def fit(self, text, max_size, width, height, face = "sans") -> int: # biggest size <= max_size whose 'text' fits in width x height, 1 if none fits
+        return self.lookup(self.fits, (face, max_size, text, width, height), self.maxFits, lambda: self.search(text, max_size, width, height, face))
+
+    def search(self, text, max_size, width, height, face) -> int:   # binary search of the size, the text size grows with the font size
+        low, high = 1, max_size
+        while low < high:
+            mid = (low + high + 1)//2
+            w, h = self.font(mid, face).size(text)
+            if w <= width and h <= height:
+                low = mid
+            else:
+                high = mid - 1
+        return low
+
+    def clear(self) -> None:
+        self.fonts.clear()
+        self.texts.clear()
+        self.fits.clear()
+
+fontCache = FontCache()
+reachabilityCache = ReachabilityCache(CACHESIZE)    # complete reachability graphs of the last SETs, shared by the modes
+
 #### interface class UI object
 class UIObj:
     def __init__(self, rect) -> None:
         self.rect = rect    # a pygame rectangle is a object with 4 attributes: left, top, width, height
         self.isClicked = 0  # True when UI object is clicked
 
-    def findMatchFont(self, max_size, name): # find a match font for rendering "name" inside the UI object
-        font = pygame.font.SysFont("sans", max_size)
-        ## if the text bigger than the object, reduce max_size
-        while font.size(name)[0] > self.rect.width or font.size(name)[1] > self.rect.height:
-            max_size -=1
-            font = pygame.font.SysFont("sans", max_size)
-        return font
+    def findMatchSize(self, max_size, name) -> int: # find the biggest font size <= max_size rendering "name" inside the UI object
+        return fontCache.fit(name, max_size, self.rect.width, self.rect.height)
+
+    def bounds(self):   # return the rect covering what draw() paints, circles go one pixel past the rect
+        return self.rect.inflate(4, 4)
+
+    def blitText(self, screen, name, max_size, color, topleft = None):  # draw "name" centered in the UI object, or from 'topleft' if given
+        text = fontCache.render(name, self.findMatchSize(max_size, name), color)
+        if topleft is None:
+            topleft = (self.rect.x + (self.rect.width-text.get_width())/2, self.rect.y + (self.rect.height-text.get_height())/2)
+        screen.blit(text, topleft)
+        return text
 
 #### Arc present the arc in both Petri Net and TS
-class Arc:
+#### the points, the bounds and the rendered label are cached, they are computed again only when an end rect or the info changes
+class Arc(PetriNetCore.Arc):
     def __init__(self, info) -> None:
-        self.info = info #### info present the information of the Arc, can be a label() or a weight)
-
-    def draw(self, screen, v1, v2) -> None: #### draw Arc on screen
+        super().__init__(info)
+        self.ends = None    # the end rects (as one tuple) of the cached points
+        self.points = None  # cached geometry(), (source, des, a1, a2, inter)
+        self.box = None     # cached bounds() for the same ends
+        self.text = None    # rendered info
+        self.textInfo = None    # the info 'text' was rendered from
+
+    def geometry(self, v1, v2): # return the points (source, des, a1, a2, inter) of the arc between rects v1 and v2, a1 and a2 end the arrowhead, None for a zero length arc
+        ends = (v1[0], v1[1], v1[2], v1[3], v2[0], v2[1], v2[2], v2[3])
+        if ends != self.ends:
+            self.points = self.compute(v1, v2)
+            self.ends = ends
+            self.box = None
+        return self.points
+
+    def label(self):    # return the rendered info
+        if self.textInfo != self.info or self.text is None:
+            self.text = fontCache.render(self.info, 15)
+            self.textInfo = self.info
+        return self.text
+
+    def compute(self, v1, v2):  # compute geometry(): anchors on the sides of v1 and v2 facing each other, arrowhead of 15 pixels at 30 degrees
         source = ()
         des = ()
         if (v2.centerx - v1.centerx) != 0:
@@ -75,119 +166,522 @@ class Arc:
             if source[1] < des[1]: rad = -rad
             a1 = (des[0]+15*math.cos(rad+(math.pi)/6), des[1]+15*math.sin(rad+(math.pi)/6))
             a2 = (des[0]+15*math.cos(rad-(math.pi)/6), des[1]+15*math.sin(rad-(math.pi)/6))
-            pygame.draw.line(screen, BLACK, source, des, 2)
-            pygame.draw.line(screen, BLACK, des, a1, 2)
-            pygame.draw.line(screen, BLACK, des, a2, 2)
-
+        else: a1 = a2 = None
         inter = (source[0]/2+des[0]/2, source[1]/2+des[1]/2)
-        font = pygame.font.SysFont("sans", 15)
-        text = font.render(self.info, True, BLACK)
-        screen.blit(text, inter)
+        return source, des, a1, a2, inter
+
+    def draw(self, screen, v1, v2) -> None: #### draw Arc on screen
+        source, des, a1, a2, inter = self.geometry(v1, v2)
+        if a1 is not None:  # the shaft and one side of the arrowhead are one polyline
+            pygame.draw.lines(screen, BLACK, False, (source, des, a1), 2)
+            pygame.draw.line(screen, BLACK, des, a2, 2)
+        screen.blit(self.label(), inter)
+
+    def bounds(self, v1, v2):   # return the rect covering what draw(screen, v1, v2) paints
+        source, des, a1, a2, inter = self.geometry(v1, v2)
+        if self.box is None or self.textInfo != self.info:
+            points = [source, des] if a1 is None else [source, des, a1, a2]
+            left = min(x[0] for x in points)
+            top = min(x[1] for x in points)
+            rect = pygame.Rect(left - 2, top - 2, max(x[0] for x in points) - left + 5, max(x[1] for x in points) - top + 5)
+            self.box = rect.union(self.label().get_rect(topleft = inter))
+        return self.box.copy()
 
     def copy(self):
         newArc = Arc(self.info)
         return newArc
 
 #### State present the state in Transition System
-class State(UIObj):
+class State(UIObj, PetriNetCore.State):
     def __init__(self, rect, name, isInit = 0) -> None:
-        super().__init__(rect)
-        self.name = name    # name of the state
-        self.isInit = isInit    # True when "self" is the initial state
-        self.font = self.findMatchFont(15, name)    # match font of the text
-        self.text = self.font.render(self.name, True, BLACK)    
+        UIObj.__init__(self, rect)
+        PetriNetCore.State.__init__(self, name, isInit)
 
-    def updateFont(self):   # update the font and the text when self->rect changes
-        self.font = self.findMatchFont(15, self.name)   
-        self.text = self.font.render(self.name, True, BLACK)
-
-    def draw(self, screen) -> None: # draw state on screen
+    def draw(self, screen, rect = None) -> None: # draw state on screen, in 'rect' instead of self.rect if given
         global WHITE
         global BLACK
+        if rect is None: rect = self.rect
+        text = fontCache.render(self.name, fontCache.fit(self.name, 15, rect.width, rect.height))   # shared through the font cache
         if self.isInit: 
-            pygame.draw.rect(screen, WHITE, self.rect)
-            pygame.draw.circle(screen, BLACK, self.rect.center, self.rect.width/2, 2)
-            pygame.draw.rect(screen, BLACK, self.rect, 2)
+            pygame.draw.rect(screen, WHITE, rect)
+            pygame.draw.circle(screen, BLACK, rect.center, rect.width/2, 2)
+            pygame.draw.rect(screen, BLACK, rect, 2)
         else:
-            pygame.draw.circle(screen, WHITE, self.rect.center, self.rect.width/2)
-            pygame.draw.circle(screen, BLACK, self.rect.center, self.rect.width/2, 2)
-        textsize = self.font.size(self.name)
-        screen.blit(self.text, (self.rect.x + (self.rect.width-textsize[0])/2, self.rect.y + (self.rect.height-textsize[1])/2))
+            pygame.draw.circle(screen, WHITE, rect.center, rect.width/2)
+            pygame.draw.circle(screen, BLACK, rect.center, rect.width/2, 2)
+        screen.blit(text, (rect.x + (rect.width-text.get_width())/2, rect.y + (rect.height-text.get_height())/2))
 
     def copy(self): # return the copy of the self object
         return State(self.rect.copy(), self.name)
 
+#### SpatialGrid: uniform grid of square cells over the rects of the nodes, a key is stored in every cell its rect overlaps,
+#### so the nodes under the mouse are found by looking at one cell instead of scanning every node
+class SpatialGrid:
+    def __init__(self, cell) -> None:
+        self.cell = max(int(cell), 8)   # side of a cell in pixels
+        self.cells = {}     # (column, row) -> set of keys whose rect overlaps the cell
+        self.rects = {}     # key -> rect the key was stored with
+
+    def span(self, rect):   # return the ranges of columns and rows overlapped by 'rect'
+        c = self.cell
+        return range(int(rect.left)//c, int(rect.right)//c + 1), range(int(rect.top)//c, int(rect.bottom)//c + 1)
+
+    def insert(self, key, rect) -> None:
+        rect = pygame.Rect(rect)
+        self.rects[key] = rect
+        columns, rows = self.span(rect)
+        for cx in columns:
+            for cy in rows:
+                self.cells.setdefault((cx, cy), set()).add(key)
+
+    def remove(self, key) -> None:
+        columns, rows = self.span(self.rects.pop(key))
+        for cx in columns:
+            for cy in rows:
+                cell = self.cells[(cx, cy)]
+                cell.discard(key)
+                if not cell: del self.cells[(cx, cy)]
+
+    def move(self, key, rect) -> None:  # the rect of 'key' changed
+        self.remove(key)
+        self.insert(key, rect)
+
+    def near(self, point):  # return the keys stored in the cell of 'point', their rects may not contain it
+        return self.cells.get((int(point[0])//self.cell, int(point[1])//self.cell), ())
+
+    def at(self, point):    # return the keys whose rect contains 'point'
+        return [x for x in self.near(point) if self.rects[x].collidepoint(point)]
+
+    def cellsIn(self, rect):    # return the non empty cells overlapped by 'rect'
+        columns, rows = self.span(rect)
+        if len(columns)*len(rows) > 2*len(self.cells):
+            return [x for key, x in self.cells.items() if key[0] in columns and key[1] in rows]
+        return [self.cells[(cx, cy)] for cx in columns for cy in rows if (cx, cy) in self.cells]
+
+    def overlapping(self, rect):    # return the set of keys stored in the cells overlapped by 'rect', their rects may not overlap it
+        keys = set()
+        for x in self.cellsIn(rect):
+            keys.update(x)
+        return keys
+
+    def estimate(self, rect) -> int:    # about the number of keys overlapping 'rect', without building their set
+        return sum(len(x) for x in self.cellsIn(rect))
+
+#### Scene: retained-mode layer over the whiteboard for a PetriNet or a TransitionSystem (the 'source').
+#### It remembers the rect every node and arc was last drawn in. touch() marks a node that moved or changed look, flush() then
+#### repaints only the old and new rects of the touched nodes and of their arcs: every item drawn there is redrawn in draw order.
+#### The items are found through SpatialGrids of their rects, so a repaint costs the items around it, not the whole scene.
+#### The source gives its items through sceneNodes() (node keys), sceneArcs() ((arc key, node key, node key) tuples),
+#### nodeBounds(key), arcBounds(key), drawNode(screen, key) and drawArc(screen, key)
+class Scene:
+    buffer = None   # surface of the size of the screen where the dirty rects are repainted, shared by all scenes
+
+    def __init__(self, source, whiteboard, note = None) -> None:
+        self.source = source
+        self.whiteboard = whiteboard.copy() # rect the scene is drawn in, repaints are clipped to it
+        self.note = note    # surface blitted at the top left of the whiteboard under the items, or None
+        self.nodeKeys = list(source.sceneNodes())   # node keys in draw order
+        self.nodeRects = [source.nodeBounds(x) for x in self.nodeKeys]  # rect of every node when last drawn
+        self.nodeAt = {x : i for i, x in enumerate(self.nodeKeys)}  # node key -> position in nodeKeys
+        self.arcKeys = []   # arc keys in draw order, arcs are drawn under the nodes
+        self.arcRects = []  # rect of every arc when last drawn
+        self.incident = {}  # node key -> positions in arcKeys of the arcs from or to the node
+        for key, u, v in source.sceneArcs():
+            self.incident.setdefault(u, []).append(len(self.arcKeys))
+            if v != u: self.incident.setdefault(v, []).append(len(self.arcKeys))
+            self.arcKeys.append(key)
+            self.arcRects.append(source.arcBounds(key))
+        cell = max([max(x.width, x.height) for x in self.nodeRects], default = 0)
+        self.nodeGrid = SpatialGrid(cell)   # positions in nodeKeys stored with their rects
+        self.arcGrid = SpatialGrid(4*cell)  # positions in arcKeys, larger cells since arcs span several nodes
+        for i, rect in enumerate(self.nodeRects):
+            self.nodeGrid.insert(i, rect)
+        for a, rect in enumerate(self.arcRects):
+            self.arcGrid.insert(a, rect)
+        self.changed = set()    # keys of the nodes touched since the last flush
+
+    @staticmethod
+    def bufferFor(screen):  # return the shared buffer, of the size of 'screen'
+        if Scene.buffer is None or Scene.buffer.get_size() != screen.get_size():
+            Scene.buffer = pygame.Surface(screen.get_size())
+        return Scene.buffer
+
+    def touch(self, node) -> None:  # mark the node 'node' as moved or changed
+        self.changed.add(node)
+
+    def flush(self, screen):    # repaint the touched nodes and their arcs, return the list of rects to pass to pygame.display.update
+        rects = []
+        for node in self.changed:
+            i = self.nodeAt[node]
+            rects.append(self.nodeRects[i])
+            self.nodeRects[i] = self.source.nodeBounds(node)
+            self.nodeGrid.move(i, self.nodeRects[i])
+            rects.append(self.nodeRects[i])
+            for a in self.incident.get(node, ()):
+                rects.append(self.arcRects[a])
+                self.arcRects[a] = self.source.arcBounds(self.arcKeys[a])
+                self.arcGrid.move(a, self.arcRects[a])
+                rects.append(self.arcRects[a])
+        self.changed.clear()
+        dirty = []  # rects to repaint, overlapping rects are merged so that no item is drawn twice in the same place
+        for rect in rects:
+            rect = rect.clip(self.whiteboard)
+            if rect.width == 0 or rect.height == 0:
+                continue
+            i = rect.collidelist(dirty)
+            while i != -1:
+                rect.union_ip(dirty.pop(i))
+                i = rect.collidelist(dirty)
+            dirty.append(rect)
+        buffer = Scene.bufferFor(screen)
+        for rect in dirty:  # items are drawn whole in the buffer, pygame draws clipped thick lines with other pixels
+            buffer.fill(WHITE, rect)
+            if self.note is not None: buffer.blit(self.note, self.whiteboard)
+            for a in sorted(x for x in self.arcGrid.overlapping(rect) if rect.colliderect(self.arcRects[x])):  # in draw order
+                self.source.drawArc(buffer, self.arcKeys[a])
+            for i in sorted(x for x in self.nodeGrid.overlapping(rect) if rect.colliderect(self.nodeRects[x])):
+                self.source.drawNode(buffer, self.nodeKeys[i])
+            screen.blit(buffer, rect, rect)
+        return dirty
+
+#### Camera: pan and zoom over the whiteboard, the world point (x, y) is drawn at origin + ((x, y) - (left, top))*zoom.
+#### Without pan and zoom the world and the screen coordinates are the same
+class Camera:
+    def __init__(self, whiteboard = None) -> None:
+        self.reset(whiteboard)
+
+    def reset(self, whiteboard = None) -> None:  # show the world without pan nor zoom
+        self.whiteboard = None if whiteboard is None else whiteboard.copy()   # screen area seen through the camera, None for the whole screen
+        self.originx, self.originy = (0, 0) if whiteboard is None else whiteboard.topleft
+        self.left, self.top = self.originx, self.originy  # world point drawn at the origin
+        self.zoom = 1.0
+
+    def toScreen(self, x, y):
+        return self.originx + (x - self.left)*self.zoom, self.originy + (y - self.top)*self.zoom
+
+    def toWorld(self, pos):
+        return self.left + (pos[0] - self.originx)/self.zoom, self.top + (pos[1] - self.originy)/self.zoom
+
+    def rect(self, left, top, size):    # return the screen rect of the world square (left, top, size), at least one pixel wide
+        x, y = self.toScreen(left, top)
+        size = max(size*self.zoom, 1)
+        return pygame.Rect(x, y, size, size)
+
+    def view(self, screen): # return the world rect seen through the camera
+        area = screen.get_rect() if self.whiteboard is None else self.whiteboard
+        return pygame.Rect(math.floor(self.left), math.floor(self.top), area.width/self.zoom + 2, area.height/self.zoom + 2)
+
+    def zoomAt(self, pos, factor) -> None:  # zoom by 'factor', the world point under the screen point 'pos' stays there
+        x, y = self.toWorld(pos)
+        self.zoom = min(max(self.zoom*factor, MINZOOM), MAXZOOM)
+        self.left = x - (pos[0] - self.originx)/self.zoom
+        self.top = y - (pos[1] - self.originy)/self.zoom
+
+    def pan(self, dx, dy) -> None:  # move the view by (dx, dy) screen pixels
+        self.left -= dx/self.zoom
+        self.top -= dy/self.zoom
+
+    def scaling(self, kx, ky) -> None:  # the window size changed, the world is scaled the same way
+        self.originx *= kx
+        self.originy *= ky
+        self.left *= kx
+        self.top *= ky
+        if self.whiteboard is not None:
+            self.whiteboard = pygame.Rect(self.whiteboard.left*kx, self.whiteboard.top*ky, self.whiteboard.width*kx, self.whiteboard.height*ky)
+
 #### Transition System object
-class TransitionSystem:
-    def __init__(self) -> None:
-        self.initState = "" # name of the initial state of the TS
-        self.states = {}    # a dict map from a name to the State which have that name, i.e: {'a' : State('a')}
-        self.adjList = {}   # a dict which each element is another dict, the adjacent list to store Arc, i.e: {'a' : {'b' : Arc('1')}} mean that an arc points from 'a' to 'b' 
+#### a lazy view over a compact ReachabilityGraph: every node only has a position (lefts, tops in world coordinates),
+#### its State widget (font + rendered text) is built the first time the node is drawn with its label.
+#### The graph may still be growing in another thread, the view shows its first 'count' states and the out edges of its first 'rows' states.
+#### Only the nodes seen through the camera are drawn, with less detail when they are small or many (see detail())
+class TransitionSystem(PetriNetCore.TransitionSystem):
+    def __init__(self, graph, names, count = None, rows = None) -> None:
+        super().__init__(graph, names, count, rows)
+        self.states = {}    # State widgets built so far, a dict map from a state index to its State
+        self.lefts = array('d', bytes(8*self.count))  # left of every node
+        self.tops = array('d', bytes(8*self.count))   # top of every node
+        self.nodewidth = 100    # width and height of every node
+        self.arcs = [Arc(x) for x in graph.net.transNames]  # one Arc per transition, the labels of the edges
+        self.edgeArcs = {}  # (source state, edge index) -> Arc of the edges drawn with arrows, it keeps their geometry, see arc()
+        self.retained = None    # the Scene of the last full draw, see scene()
+        self.grid = None    # SpatialGrid of the node rects, see spatial()
+        self.camera = Camera()  # pan and zoom of the view, reset by autoScale()
+        self.level = 2  # detail level of the last draw, see detail()
+        self.visible = []   # nodes drawn by the last draw
+        self.reverse = None # reverse[y] lists the (source, edge) pairs of the edges to y, see incoming()
+        self.clustered = None   # ((cell size, count), cell of every node, nodes of every cell) of the last clusters(), dropped when nodes move
+
+    def rect(self, i):  # return the world rect of node i, at least one pixel wide
+        return pygame.Rect(self.lefts[i], self.tops[i], max(self.nodewidth, 1), max(self.nodewidth, 1))
+
+    def screenRect(self, i):    # return the rect of node i on the screen
+        return self.camera.rect(self.lefts[i], self.tops[i], self.nodewidth)
+
+    def state(self, i): # return the State widget of node i, build it on first use
+        if i not in self.states:
+            self.states[i] = State(self.rect(i), self.label(i), i==0)
+        return self.states[i]
+
+    def node(self, i):  # same as state(), named like PetriNet.node
+        return self.state(i)
+
+    def spatial(self):  # return the SpatialGrid of the node rects, built on first use after the nodes were placed
+        if self.grid is None:
+            self.grid = SpatialGrid(self.nodewidth)
+            for x in range(self.count):
+                self.grid.insert(x, self.rect(x))
+        return self.grid
+
+    def contains(self, i, x, y) -> bool:    # True if the world point (x, y) is inside node i
+        return self.lefts[i] <= x < self.lefts[i] + max(self.nodewidth, 1/self.camera.zoom) and self.tops[i] <= y < self.tops[i] + max(self.nodewidth, 1/self.camera.zoom)
+
+    def pick(self, pos):    # return the index of the state under the screen point 'pos', the last drawn one if they overlap, or None
+        if self.level == 0:     # clusters can not be dragged
+            return None
+        x, y = self.camera.toWorld(pos)
+        keys = [i for i in self.spatial().near((x, y)) if self.contains(i, x, y)]
+        return max(keys) if keys else None
+
+    def moveBy(self, i, relx, rely, whiteboard):    # drag node i by (relx, rely) screen pixels, it stays inside the whiteboard
+        zoom = self.camera.zoom
+        width = max(self.nodewidth, 1)
+        self.lefts[i] = min(max(self.lefts[i] + relx/zoom, whiteboard.left), whiteboard.right - width)
+        self.tops[i] = min(max(self.tops[i] + rely/zoom, whiteboard.top), whiteboard.bottom - width)
+        self.spatial().move(i, self.rect(i))
+        self.clustered = None
+
+    def incoming(self): # return reverse, the in edges of every shown node, built again when the TS grows
+        if self.reverse is None:
+            graph = self.graph
+            self.reverse = [[] for x in range(self.count)]
+            for x in range(self.rows):
+                for e in range(graph.offsets[x], graph.offsets[x + 1]):
+                    if graph.targets[e] < self.count:
+                        self.reverse[graph.targets[e]].append((x, e))
+        return self.reverse
+
+    def edges(self, visible):   # yield the (source, edge) pairs of the shown edges with an end in 'visible', a set of nodes
+        graph = self.graph
+        reverse = self.incoming()
+        for x in visible:
+            if x < self.rows:
+                for e in range(graph.offsets[x], graph.offsets[x + 1]):
+                    if graph.targets[e] < self.count:
+                        yield x, e
+            for x2, e in reverse[x]:
+                if x2 not in visible:
+                    yield x2, e
+
+    def detail(self, visible) -> int:   # 2 draws labeled states and arcs, 1 draws dots and lines when nodes are smaller than LODSIZE pixels,
+        if visible > CLUSTERLIMIT:      # 0 draws clusters when more than CLUSTERLIMIT states are visible
+            return 0
+        if self.nodewidth*self.camera.zoom < LODSIZE:
+            return 1
+        return 2
+
+    def draw(self, screen): # draw Transition System on screen, only nodes seen through the camera are drawn
+        camera = self.camera
+        view = camera.view(screen)
+        self.level = self.detail(self.spatial().estimate(view))
+        self.visible = []
+        if self.level > 0:
+            right, bottom = view.right, view.bottom
+            width = max(self.nodewidth, 1/camera.zoom)
+            lefts, tops = self.lefts, self.tops
+            self.visible = sorted(i for i in self.spatial().overlapping(view) if lefts[i] < right and tops[i] < bottom and lefts[i] + width > view.left and tops[i] + width > view.top)
+        target = screen
+        if camera.whiteboard is not None:   # draw in the buffer and copy the whiteboard back, nodes out of it must not cover the taskbar
+            target = Scene.bufferFor(screen)
+            target.blit(screen, camera.whiteboard, camera.whiteboard)
+        if self.level == 0:
+            self.drawClusters(target, view)
+        else:
+            for x, e in self.edges(set(self.visible)):
+                self.drawArc(target, (x, e))
+            for x in self.visible:
+                self.drawNode(target, x)
+        if target is not screen: screen.blit(target, camera.whiteboard, camera.whiteboard)
+        self.retained = None
+
+    def clusters(self, size):   # return the cell of every node and the nodes of every cell (a dict), for world squares of side 'size'
+        key = (size, self.count)    # they are kept until nodes move or the TS grows
+        if self.clustered is None or self.clustered[0] != key:
+            half = self.nodewidth/2
+            of = [(int((self.lefts[x] + half)//size), int((self.tops[x] + half)//size)) for x in range(self.count)]  # node -> its cell
+            members = {}
+            for x, c in enumerate(of):
+                members.setdefault(c, []).append(x)
+            self.clustered = (key, of, members)
+        return self.clustered[1], self.clustered[2]
+
+    def drawClusters(self, screen, view):   # draw one square per cell holding states, and one line per pair of linked cells when
+        camera = self.camera                # the shown states have at most CLUSTERLINKS edges
+        size = 2**math.ceil(math.log2(CLUSTERCELL/camera.zoom)) # world side of a cell, a power of 2 so that panning keeps the cells
+        of, members = self.clusters(size)
+        columns = range(math.floor(view.left/size), math.floor(view.right/size) + 1)
+        rows = range(math.floor(view.top/size), math.floor(view.bottom/size) + 1)
+        if len(columns)*len(rows) > len(members):
+            shown = [c for c in members if c[0] in columns and c[1] in rows]
+        else:
+            shown = [(cx, cy) for cx in columns for cy in rows if (cx, cy) in members]
+        side = size*camera.zoom
+        def center(c):
+            x, y = camera.toScreen(c[0]*size, c[1]*size)
+            return x + side/2, y + side/2
+        states = sum(len(members[c]) for c in shown)
+        if self.graph.offsets[self.rows]*states <= CLUSTERLINKS*self.count:    # about the number of edges of the shown states
+            graph = self.graph
+            reverse = self.incoming()
+            links = set()
+            for c in shown:
+                for x in members[c]:
+                    ends = [y for y in graph.targets[graph.offsets[x]:graph.offsets[x + 1]] if y < self.count] if x < self.rows else []
+                    ends.extend(y for y, e in reverse[x])
+                    for y in ends:
+                        if of[y] != c: links.add((c, of[y]) if c < of[y] else (of[y], c))
+            for c, d in links:
+                pygame.draw.line(screen, LIGHTGRAY, center(c), center(d))
+        for c in shown:
+            x, y = camera.toScreen(c[0]*size, c[1]*size)
+            pygame.draw.rect(screen, BLUE if 0 in members[c][:1] else GRAY, (x, y, max(side - 1, 1), max(side - 1, 1)))
+
+    def scene(self, whiteboard, note = None):   # return the Scene of the TS for partial repaints, built again after every full draw
+        if self.retained is None:
+            self.retained = Scene(self, whiteboard, note)
+        return self.retained
+
+    def sceneNodes(self):   # nodes are the state indices drawn by the last draw, arcs are (source state, edge index) pairs
+        return self.visible
+
+    def sceneArcs(self):
+        graph = self.graph
+        for x, e in self.edges(set(self.visible)):
+            yield (x, e), x, graph.targets[e]
+
+    def nodeBounds(self, i):
+        return self.screenRect(i).inflate(4, 4)
+
+    def arc(self, key): # return the Arc of the edge 'key', the Arcs of the edges not drawn for a while are dropped
+        if key not in self.edgeArcs:
+            if len(self.edgeArcs) >= 4*CLUSTERLIMIT:
+                self.edgeArcs = {}
+            self.edgeArcs[key] = Arc(self.arcs[self.graph.labels[key[1]]].info)
+        return self.edgeArcs[key]
+
+    def arcBounds(self, key):
+        x, e = key
+        if self.level < 2:
+            return pygame.Rect(self.screenRect(x).center, (0, 0)).union(pygame.Rect(self.screenRect(self.graph.targets[e]).center, (0, 0))).inflate(4, 4)
+        return self.arc(key).bounds(self.screenRect(x), self.screenRect(self.graph.targets[e]))
+
+    def drawNode(self, screen, i):
+        if self.level < 2:
+            pygame.draw.rect(screen, BLUE if i==0 else BLACK, self.screenRect(i))
+        else:
+            self.state(i).draw(screen, self.screenRect(i))
 
-    def draw(self, screen): # draw Transition System on screen
-        for x in self.adjList:
-            for y in self.adjList[x]:
-                self.adjList[x][y].draw(screen, self.states[x].rect, self.states[y].rect)
-        for x in self.states:
-            self.states[x].draw(screen)
+    def drawArc(self, screen, key):
+        x, e = key
+        if self.level < 2:
+            pygame.draw.line(screen, GRAY, self.screenRect(x).center, self.screenRect(self.graph.targets[e]).center)
+        else:
+            self.arc(key).draw(screen, self.screenRect(x), self.screenRect(self.graph.targets[e]))
+
+    def place(self, first, whiteboard): # give a random place in the whiteboard to the nodes first .. count-1, node 0 goes to the top left corner
+        self.clustered = None
+        for x in range(first, self.count):
+            if x==0:
+                self.lefts[x] = whiteboard.left + self.nodewidth/2
+                self.tops[x] = whiteboard.top + self.nodewidth/2
+            else:
+                self.lefts[x] = whiteboard.left + self.nodewidth/2 + random.random()*(whiteboard.width - 2*self.nodewidth)
+                self.tops[x] = whiteboard.top + self.nodewidth/2 + random.random()*(whiteboard.height - 2*self.nodewidth)
 
-    def autoScale(self, whiteboard):    # arrange TS to fit the whiteboard rect when initializing
+    def fit(self, whiteboard):  # set the node width from the number of states, nodes keep their centers
         nodewidth = 0
-        if (len(self.states) - 2) > 15:
-            nodewidth = whiteboard.width/(len(self.states) - 2)
+        if (self.count - 2) > 15:
+            nodewidth = whiteboard.width/(self.count - 2)
         else: 
             nodewidth = whiteboard.width/15
-        self.states[self.initState].rect.left = whiteboard.left + nodewidth/2
-        self.states[self.initState].rect.top = whiteboard.top + nodewidth/2
-        for x in self.states:
-            self.states[x].rect.width = nodewidth
-            self.states[x].rect.height = nodewidth
-            self.states[x].updateFont()
-            if x==self.initState: continue
-            else:
-                self.states[x].rect.centerx = whiteboard.left + nodewidth + random.random()*(whiteboard.width - 2*nodewidth)
-                self.states[x].rect.centery = whiteboard.top + nodewidth + random.random()*(whiteboard.height - 2*nodewidth)
+        shift = (self.nodewidth - nodewidth)/2
+        for x in range(self.count):
+            self.lefts[x] += shift
+            self.tops[x] += shift
+        self.nodewidth = nodewidth
+        self.grid = None
+        self.clustered = None
+        if self.camera.whiteboard is None: self.camera.reset(whiteboard)
+
+    def arrange(self, whiteboard, method = "layered", seed = 0, layout = None): # place every node with PetriNetLayout, 'method' is 'layered', 'force' or 'random'
+        if method == "random":                                                  # 'layout' is an (xs, ys) pair already computed for this TS
+            self.place(0, whiteboard)
+            return
+        if layout is None:
+            edges = self.graph.edges(self.rows, self.count)
+            layout = layeredLayout(self.count, edges) if method == "layered" else forceLayout(self.count, edges, seed = seed)
+        xs, ys = layout
+        for x in range(self.count):
+            self.lefts[x] = whiteboard.left + self.nodewidth/2 + xs[x]*(whiteboard.width - 2*self.nodewidth)
+            self.tops[x] = whiteboard.top + self.nodewidth/2 + ys[x]*(whiteboard.height - 2*self.nodewidth)
+        self.grid = None
+        self.clustered = None
+
+    def autoScale(self, whiteboard, method = "layered"):    # arrange TS to fit the whiteboard rect when initializing
+        self.fit(whiteboard)
+        self.arrange(whiteboard, method)
+        self.camera.reset(whiteboard)
+        self.grid = None
+
+    def grow(self, count, rows, whiteboard):    # show the states and edges the graph gained since the last call, new nodes get a random place
+        first = self.count
+        self.lefts.extend(array('d', bytes(8*(count - first))))
+        self.tops.extend(array('d', bytes(8*(count - first))))
+        super().grow(count, rows)
+        self.reverse = None
+        self.place(first, whiteboard)
+        if self.grid is not None:
+            for x in range(first, count):
+                self.grid.insert(x, self.rect(x))
     
     def scaling(self, kx, ky):  # scaling TS when the size of the window is changed
         kw = 0
         if kx < ky: kw = kx
         else: kw = ky
-        for x in self.states.values():
-            x.rect.left *= kx
-            x.rect.top *= ky
-            x.rect.width *= kw
-            x.rect.height *= kw
-            x.updateFont()
+        for x in range(self.count):
+            self.lefts[x] *= kx
+            self.tops[x] *= ky
+        self.nodewidth *= kw
+        self.camera.scaling(kx, ky)
+        self.grid = None
+        self.clustered = None
 
 #### present the place in Petri Net
-class Place(UIObj):
+class Place(UIObj, PetriNetCore.Place):
     def __init__(self, rect, name, tokens = 0) -> None:
-        super().__init__(rect)
-        self.name = name    # name of the place
-        self.tokens = tokens    # the number of tokens are hold by place
+        UIObj.__init__(self, rect)
+        PetriNetCore.Place.__init__(self, name, tokens)
 
     def draw(self, screen) -> None: # draw place on screen
         global WHITE
         global BLACK
         pygame.draw.circle(screen, WHITE, self.rect.center, self.rect.width/2)
         pygame.draw.circle(screen, BLACK, self.rect.center, self.rect.width/2, 2)
-        font1 = self.findMatchFont(20, str(self.tokens))
-        text1 = font1.render(str(self.tokens), True, BLACK)
-        text1size = font1.size(str(self.tokens))
-        screen.blit(text1, (self.rect.x + (self.rect.width-text1size[0])/2, self.rect.y + (self.rect.height-text1size[1])/2))
-        font2 = self.findMatchFont(15, self.name)
-        text2 = font2.render(self.name, True, BLACK)
-        text2size = font2.size(self.name)
-        screen.blit(text2, (self.rect.x + (self.rect.width-text2size[0])/2, self.rect.bottom))
+        self.blitText(screen, str(self.tokens), 20, BLACK)
+        text2 = fontCache.render(self.name, self.findMatchSize(15, self.name))
+        screen.blit(text2, (self.rect.x + (self.rect.width-text2.get_width())/2, self.rect.bottom))
+
+    def bounds(self):   # the rect and the name written under it
+        text = fontCache.render(self.name, self.findMatchSize(15, self.name))
+        return self.rect.inflate(4, 4).union(text.get_rect(midtop = (self.rect.x + self.rect.width/2, self.rect.bottom)).inflate(4, 4))
 
     def copy(self): # return the copy of place
         return Place(self.rect.copy(), self.name, self.tokens)
 
 #### present the transition in Petri Net
-class Transition(UIObj):
+class Transition(UIObj, PetriNetCore.Transition):
     def __init__(self, rect, name) -> None:
-        super().__init__(rect)
-        self.name = name    # name of the transition
+        UIObj.__init__(self, rect)
+        PetriNetCore.Transition.__init__(self, name)
         self.isMoving = 0   # True if the transition is moving by mouse click
 
     def draw(self, screen, isEnable):   # draw transition on screen
@@ -197,103 +691,25 @@ class Transition(UIObj):
             pygame.draw.rect(screen, YELLOW, self.rect)
         else: pygame.draw.rect(screen, WHITE, self.rect)
         pygame.draw.rect(screen, BLACK, self.rect, 2)
-        font = self.findMatchFont(15, self.name)
-        text = font.render(self.name, True, BLACK)
-        textsize = font.size(self.name)
-        screen.blit(text, (self.rect.x + (self.rect.width-textsize[0])/2, self.rect.y + (self.rect.height-textsize[1])/2))
+        self.blitText(screen, self.name, 15, BLACK)
 
     def copy(self): # return the copy of the transition
         return Transition(self.rect.copy(), self.name)
 
 #### Petri Net object
-class PetriNet:
+#### the model is PetriNetCore.PetriNet, this class places its nodes on the whiteboard and draws them
+class PetriNet(PetriNetCore.PetriNet):
     def __init__(self) -> None:
-        self.places = {}    # a dict map from a name to a place which have that name, i.e: {'a' : Place('a')}
-        self.transitions = {}   # a dict map from a name to a transition which have that name, i.e {'b' : Transition('b')}
-        self.adjList = {}   # a dict which each element is another dict, the adjacent list to store Arc, i.e: {'a' : {'b' : Arc('1')}} mean that an arc points from a to b
-
-    def preset(self, name): # return a dict which is the preset of the 'name'
-        preset = {}
-        if name not in self.adjList:
-            return preset
-        else:
-            for x in self.adjList:
-                if name in self.adjList[x]:
-                    preset[x] = self.adjList[x][name]
-            return preset
+        super().__init__()
+        self.retained = None    # the Scene of the last full draw, see scene()
+        self.grid = None    # SpatialGrid of the place and transition rects, see spatial()
 
-    def isEnable(self, name) -> bool:   # check if a transition having the 'name' is enable, return True if enable
-        if name not in self.transitions:
-            return False
-        else: 
-            preset = self.preset(name)
-            for x in preset:
-                if self.places[x].tokens < int(preset[x].info):
-                    return False
-            return True
-
-    def firing(self, name): # firing a transition have the 'name', return True if success
-        if self.isEnable(name):
-            preset = self.preset(name)
-            for x in preset:
-                self.places[x].tokens -= int(preset[x].info)
-            for x in self.adjList[name]:
-                self.places[x].tokens += int(self.adjList[name][x].info)
-            return True
-        else: return False
-
-    def setMarking(self, dict): # set place's tokens with a dict maps from name to the number of tokens, i.e: {'a' : 1, 'b' : 2}
-        for x in dict:
-            self.places[x].tokens = dict[x]
-
-    def markingString(self, names) -> str: # return a string of the marking with 'names' is the list of names of places we need to know, i.e: return '(1,0,0)' with 'names' is ['free', 'busy', 'docu']
-        marking = "("
-        if (len(names) > 0):
-            marking += str(self.places[names[0]].tokens)
-        for i in range(1, len(names)):
-            marking +=  "," + str(self.places[names[i]].tokens)
-        marking += ")"
-        return marking
-
-    def markingDict(self): # return a dict of marking which maps from a name to the number of tokens, i.e: {'free' : 1, 'busy' : 2}
-        dict = {}
-        for x in self.places:
-            dict[x] = self.places[x].tokens
-        return dict
-    
-    def copy(self):  # return a copy of the Petri Net
-        newPetriNet = PetriNet()
-        for x in self.places:
-            newPetriNet.places[x] = self.places[x].copy()
-        for x in self.transitions:
-            newPetriNet.transitions[x] = self.transitions[x].copy()
-        for x in self.adjList:
-            newPetriNet.adjList[x] = {}
-            for y in self.adjList[x]:
-                newPetriNet.adjList[x][y] = self.adjList[x][y].copy()
-        return newPetriNet
-
-    def reachabilityGraph(self, names): # return a Transition System which is the reachability graph of the Petri Net
-        ts = TransitionSystem()
-        tempPN = self.copy()
-        queue = [tempPN.markingDict()]
-        ts.states[tempPN.markingString(names)] = State(pygame.Rect(0, 0, 100, 100), tempPN.markingString(names), 1)
-        ts.initState = tempPN.markingString(names)
-        ts.adjList[tempPN.markingString(names)] = {}
-        while len(queue)>0:
-            popmark = queue.pop(0)
-            for x in tempPN.transitions:
-                tempPN.setMarking(popmark)
-                v1 = tempPN.markingString(names)
-                if tempPN.isEnable(x):
-                    tempPN.firing(x)
-                    v2 = tempPN.markingString(names)
-                    if v2 not in ts.states:
-                        ts.states[v2] = State(pygame.Rect(0, 0, 100, 100), v2)
-                        ts.adjList[v2] = {}
-                        queue.append(tempPN.markingDict())
-                    ts.adjList[v1][v2] = Arc(x)
-        return ts            
+    def invalidate(self):   # drop the CompiledNet and the SpatialGrid, must be called after places, transitions or adjList are edited directly
+        super().invalidate()
+        self.grid = None
+
+    def reachabilityGraph(self, names, workers = 1, stubborn = False, targets = (), **limits): # return a Transition System which is the reachability graph of the Petri Net
+        return TransitionSystem(self.explore(workers, stubborn, targets, **limits), names)
 
     def draw(self, screen): # draw Petri Net on screen
         for x in self.adjList:
@@ -306,6 +722,73 @@ class PetriNet:
             self.places[x].draw(screen)
         for x in self.transitions:
             self.transitions[x].draw(screen, self.isEnable(self.transitions[x].name))
+        self.retained = None
+
+    def scene(self, whiteboard, note = None):   # return the Scene of the Petri Net for partial repaints, built again after every full draw
+        if self.retained is None:
+            self.retained = Scene(self, whiteboard, note)
+        return self.retained
+
+    def sceneNodes(self):   # nodes are place and transition names, arcs are (source, target) pairs of names
+        return list(self.places) + list(self.transitions)
+
+    def sceneArcs(self):
+        for x in self.adjList:
+            for y in self.adjList[x]:
+                yield (x, y), x, y
+
+    def node(self, name):   # return the Place or the Transition having the 'name'
+        if name in self.places:
+            return self.places[name]
+        return self.transitions[name]
+
+    def spatial(self):  # return the SpatialGrid of the node rects, built on first use
+        if self.grid is None:
+            nodes = list(self.places.values()) + list(self.transitions.values())
+            self.grid = SpatialGrid(max([max(x.rect.width, x.rect.height) for x in nodes], default = 0))
+            for x in nodes:
+                self.grid.insert(x.name, x.rect)
+        return self.grid
+
+    def moveBy(self, name, relx, rely, whiteboard):    # drag the node 'name' by (relx, rely), it stays inside the whiteboard
+        x = self.node(name)
+        dragBy(x.rect, relx, rely, whiteboard)
+        self.spatial().move(name, x.rect)
+
+    def pick(self, pos):    # return the name of the node under 'pos', transitions are drawn over places, or None
+        keys = self.spatial().at(pos)
+        for x in keys:
+            if x in self.transitions: return x
+        return keys[0] if keys else None
+
+    def nodeBounds(self, name):
+        return self.node(name).bounds()
+
+    def arcBounds(self, key):
+        x, y = key
+        return self.adjList[x][y].bounds(self.node(x).rect, self.node(y).rect)
+
+    def drawNode(self, screen, name):
+        if name in self.places:
+            self.places[name].draw(screen)
+        else:
+            self.transitions[name].draw(screen, self.isEnable(name))
+
+    def drawArc(self, screen, key):
+        x, y = key
+        self.adjList[x][y].draw(screen, self.node(x).rect, self.node(y).rect)
+
+    def arrange(self, whiteboard, method = "layered", seed = 0):  # place the places and transitions with PetriNetLayout, 'method' is 'layered' or 'force'
+        nodes = list(self.places.values()) + list(self.transitions.values())    # layers start from the marked places, else from the transitions without preset
+        index = {x.name : i for i, x in enumerate(nodes)}
+        edges = [(index[x], index[y]) for x in self.adjList for y in self.adjList[x]]
+        roots = [index[x] for x in self.places if self.places[x].tokens > 0] or [index[x] for x in self.transitions if not self.preset(x)] or [0]
+        if method == "layered": xs, ys = layeredLayout(len(nodes), edges, roots)
+        else: xs, ys = forceLayout(len(nodes), edges, seed = seed, roots = roots)
+        margin = max([max(x.rect.width, x.rect.height) for x in nodes], default = 0)
+        for i, x in enumerate(nodes):
+            x.rect.center = (whiteboard.left + margin/2 + xs[i]*(whiteboard.width - margin), whiteboard.top + margin/2 + ys[i]*(whiteboard.height - margin))
+        self.grid = None
 
     def scaling(self, kx, ky):  # scaling Petri Net when window's size is changed
         kw = 0
@@ -321,6 +804,7 @@ class PetriNet:
             x.rect.top *= ky
             x.rect.width *= kw
             x.rect.height *= kw
+        self.grid = None
 ### end of Petri Net implement
 ###########################
 
@@ -342,10 +826,260 @@ class Button(UIObj):
         else: color = self.color
         if self.transparent == 0:
             pygame.draw.rect(screen, color, self.rect)
-        font = self.findMatchFont(20, self.name)
-        text = font.render(self.name, True, self.renderCol)
-        textsize = font.size(self.name)
-        screen.blit(text, (self.rect.x + (self.rect.width-textsize[0])/2, self.rect.y + (self.rect.height-textsize[1])/2))
+        self.blitText(screen, self.name, 20, self.renderCol)
+
+#### BackgroundBuild: builds the reachability graph of a Petri Net in a worker thread while the main loop keeps running,
+#### the TransitionSystem view of the graph grows with the states found so far (see poll)
+class BackgroundBuild:
+    def __init__(self) -> None:
+        self.thread = None
+        self.cancel = threading.Event() # set to stop the running build
+        self.progress = None    # last ExplorationProgress of the running build
+        self.ts = None  # TransitionSystem view of the graph being built
+        self.done = True    # True when the build is finished and the view shows all of it
+        self.layout = None  # layered layout of the finished graph, computed by the worker thread
+
+    def start(self, petriNet, names, whiteboard):   # stop the running build and start one from the current marking of 'petriNet', return its TransitionSystem view
+        self.stop()
+        compiled = petriNet.compile()
+        marking = compiled.marking(petriNet.markingDict())
+        self.cancel = threading.Event()
+        self.progress = None
+        self.layout = None
+        self.done = False
+        ready = threading.Event()
+        self.thread = threading.Thread(target = self.run, args = (compiled, marking, self.cancel, ready), daemon = True)
+        self.thread.start()
+        ready.wait()    # the first progress report, its graph may already be complete when it comes from reachabilityCache
+        self.ts = TransitionSystem(self.progress.graph, names, 1, 0)    # the view starts with the initial state, poll() grows it
+        self.ts.autoScale(whiteboard)
+        return self.ts
+
+    def run(self, compiled, marking, cancel, ready):    # body of the worker thread
+        def report(progress):
+            if not cancel.is_set():
+                self.progress = progress
+            ready.set()
+        try:    # a graph already built for this marking, or holding it as a state, comes from reachabilityCache without exploring
+            graph = reachabilityCache.get(compiled, marking, progress = report, cancel = cancel, interval = 0.1)
+            if graph is not None:
+                report(ExplorationProgress(graph, 0.0))
+            else:
+                graph = explore(compiled, marking, progress = report, cancel = cancel, interval = 0.1)
+                if not cancel.is_set():
+                    reachabilityCache.put(compiled, marking, graph)
+            if not cancel.is_set():
+                self.layout = layeredLayout(len(graph), graph.edges())
+        finally:
+            ready.set()
+
+    def stop(self): # cancel the running build
+        self.cancel.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def isRunning(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def poll(self, whiteboard) -> bool: # grow the view to the last progress report, return True if the view changed
+        if self.ts is None or self.done:
+            return False
+        finished = not self.isRunning()     # read before the progress: a build ending in between still gives its last report
+        progress = self.progress
+        if progress.states != self.ts.count or progress.states - progress.frontier != self.ts.rows:
+            self.ts.grow(progress.states, progress.states - progress.frontier, whiteboard)
+        elif not finished:
+            return False
+        if finished:
+            self.done = True
+            self.ts.fit(whiteboard)
+            if self.layout is not None and len(self.layout[0]) == self.ts.count:
+                self.ts.arrange(whiteboard, layout = self.layout)
+        return True
+
+    def drawStatus(self, screen, whiteboard, font):    # write the progress of the running build at the bottom of the whiteboard
+        if self.done or self.progress is None:
+            return
+        progress = self.progress
+        text = font.render("exploring: %d states, %d in frontier, %d states/s" % (progress.states, progress.frontier, progress.statesPerSecond), True, BLACK)
+        screen.blit(text, (whiteboard.left, whiteboard.bottom - text.get_height()))
+
+def dragBy(rect, relx, rely, whiteboard):  # move 'rect' by (relx, rely), it stays inside the whiteboard
+    if relx < 0:
+        if rect.left + relx < whiteboard.left:
+            rect.left = whiteboard.left
+        else: rect.left += relx
+    else:
+        if rect.right + relx > whiteboard.right:
+            rect.right = whiteboard.right
+        else: rect.right += relx
+    if rely < 0:
+        if rect.top + rely < whiteboard.top:
+            rect.top = whiteboard.top
+        else: rect.top += rely
+    else:
+        if rect.bottom + rely > whiteboard.bottom:
+            rect.bottom = whiteboard.bottom
+        else: rect.bottom += rely
+
+def grab(source, pos, note):    # start dragging the node of 'source' (PetriNet or TransitionSystem) under 'pos', return the dragged reference or None
+    key = source.pick(pos)
+    if key is None:
+        return None
+    x = source.node(key)
+    x.isClicked = 1
+    pygame.mouse.get_rel()
+    source.scene(whiteboard, note)  # remember where everything is drawn before the drag moves it
+    return (source, key, x, note)
+
+def activeView():   # return the TS shown on the whiteboard and the note naming the places of its states, or (None, None)
+    return modes[mode].view()
+
+def coldMode():  # return a mode whose graphs are not made yet, or None
+    for x in modes:
+        if x.graphs is None: return x
+    return None
+
+def building() -> bool: # True while a background build has states its view does not show yet
+    return any(x.build is not None and not x.build.done for x in modes)
+
+def redrawView(ts, note):   # draw the whiteboard again with the TS 'ts' and the progress of its build
+    pygame.draw.rect(screen, WHITE, whiteboard)
+    screen.blit(note, whiteboard)
+    ts.draw(screen)
+    for x in modes:
+        if x.build is not None and x.build.ts is ts: x.build.drawStatus(screen, whiteboard, fontnote)
+    pygame.display.update(whiteboard)
+
+#### Guide: the GUIDE page of the workspace, only text on the whiteboard
+class Guide:
+    def __init__(self, guides) -> None:
+        self.guides = guides
+        self.graphs = []
+        self.build = None
+
+    def view(self):
+        return None, None
+
+    def draw(self, screen) -> None:
+        for x in self.guides:
+            x.draw(screen)
+
+    def press(self, pos):
+        return None
+
+#### Mode: a question page of the workspace, the main loop gives it the left clicks on the taskbar and the whiteboard (see press).
+#### graphs is [PetriNet] or [PetriNet, TransitionSystem] with 'active' the index of the shown one. The entries 'tokens' of the initial
+#### marking use upButtons and downButtons from 'offset', 'marking' maps their values to the marking of the Petri Net.
+#### With 'paired' the entry x + 3 is the maximum of the entry x and never gets below it.
+#### The graphs are made by 'create' when the mode is opened (or warmed) for the first time, see load()
+class Mode:
+    def __init__(self, create, tokens, offset, texts, marking, names = None, note = None, paired = False) -> None:
+        self.create = create    # function returning the Petri Net of the mode
+        self.graphs = None
+        self.active = 0
+        self.tokens = tokens
+        self.offset = offset
+        self.texts = texts  # labels of the entries
+        self.marking = marking
+        self.names = names  # places written in the states of the TS, None if the mode has no TS
+        self.note = note    # rendered names, shown above the TS
+        self.paired = paired
+        self.build = BackgroundBuild() if names is not None else None  # reachability graph build started by SET
+
+    def view(self):
+        if self.active == 1: return self.graphs[1], self.note
+        return None, None
+
+    def load(self) -> None: # make the Petri Net and start building its TS in the background, the first time only
+        if self.graphs is not None:
+            return
+        self.graphs = [self.create()]
+        if self.build is not None:
+            self.graphs.append(self.build.start(self.graphs[0], self.names, whiteboard))
+
+    def warm(self, screen) -> None: # load the mode and draw it off screen, so that its fonts and texts are cached when it is opened
+        self.load()
+        surface = pygame.Surface(screen.get_size())
+        for x in self.graphs:
+            x.draw(surface)
+
+    def drawSwitch(self, screen) -> None:   # draw PETRI NET and T.SYSTEM, the shown graph is highlighted
+        if self.names is None:
+            return
+        petriButton.active = 1 - self.active
+        tsButton.active = self.active
+        petriButton.draw(screen)
+        tsButton.draw(screen)
+
+    def draw(self, screen) -> None: # draw the taskbar and the whiteboard of the mode
+        self.load()
+        self.drawSwitch(screen)
+        for x in self.texts:
+            x.draw(screen)
+        for x in range(len(self.tokens)):
+            self.tokens[x].draw(screen)
+            upButtons[x + self.offset].draw(screen)
+            downButtons[x + self.offset].draw(screen)
+        if self.active == 1: screen.blit(self.note, whiteboard)
+        self.graphs[self.active].draw(screen)
+        createButton.draw(screen)
+
+    def press(self, pos):   # handle a left click at 'pos' in the workspace, return the dragged reference of grab() or None
+        if taskbar.collidepoint(pos):
+            if createButton.rect.collidepoint(pos): self.set()
+            elif self.names is not None and petriButton.rect.collidepoint(pos): self.show(0)
+            elif self.names is not None and tsButton.rect.collidepoint(pos): self.show(1)
+            else:
+                for x in range(len(self.tokens)):
+                    if upButtons[x + self.offset].rect.collidepoint(pos):
+                        self.step(x, 1)
+                        break
+                    elif downButtons[x + self.offset].rect.collidepoint(pos):
+                        self.step(x, -1)
+                        break
+        elif whiteboard.collidepoint(pos):
+            return grab(self.graphs[self.active], pos, self.note if self.active == 1 else None)
+        return None
+
+    def set(self) -> None:  # SET: give the entries to the Petri Net, start building its TS and show the Petri Net
+        createButton.active = 1
+        createButton.draw(screen)
+        pygame.display.update(createButton.rect)
+        self.graphs[0].setMarking(self.marking([int(x.name) for x in self.tokens]))
+        if self.build is not None:
+            self.graphs[1] = self.build.start(self.graphs[0], self.names, whiteboard)
+        self.active = 0
+        pygame.draw.rect(screen, WHITE, whiteboard)
+        self.graphs[0].draw(screen)
+        self.drawSwitch(screen)
+        createButton.active = 0
+        createButton.draw(screen)
+        pygame.display.update(workspace)
+
+    def show(self, i) -> None:  # show the Petri Net (0) or the TS (1) on the whiteboard
+        if self.active == i:
+            return
+        self.active = i
+        self.drawSwitch(screen)
+        pygame.draw.rect(screen, WHITE, whiteboard)
+        if i == 1: screen.blit(self.note, whiteboard)
+        self.graphs[i].draw(screen)
+        pygame.display.update(workspace)
+
+    def step(self, x, d) -> None:   # add d to the entry x
+        value = int(self.tokens[x].name) + d
+        if value < 0 or (self.paired and x >= 3 and value < int(self.tokens[x - 3].name)):
+            return
+        changed = [x]
+        self.tokens[x].name = str(value)
+        if self.paired and x < 3 and value > int(self.tokens[x + 3].name):
+            self.tokens[x + 3].name = str(value)
+            changed.append(x + 3)
+        for y in changed:
+            self.tokens[y].draw(screen)
+        pygame.display.update([self.tokens[y].rect for y in changed])
 
 def refeshScreen(kx, ky):
     global workspace
@@ -393,56 +1127,6 @@ def refeshScreen(kx, ky):
     global token3
 
     global nodewidth
-    ##### init graph 0
-    global slotfree0
-    global slotbusy0
-    global slotdocu0
-
-    global start0
-    global change0
-    global end0
-
-    global free0
-    global busy0
-    global docu0
-
-    global petri0
-
-    global graph0
-    global activeGraph0
-    ###
-    ###### init graph 1
-    global free1
-    global docu1
-    global start1
-    global change1
-    global end1
-    global busy1
-    global graph1
-    global activeGraph1
-    ####
-    #### init graph 2
-    global wait2
-    global done2
-    global inside2
-    global start2
-    global change2
-    global graph2
-
-    ###
-    ##### init graph 3
-    global wait3
-    global done3
-    global busy3
-    global inside3
-    global start3
-    global change3
-    global free3
-    global end3
-    global docu3
-    global graph3
-    global activeGraph3
-
     global mode
     global guides
 
@@ -493,7 +1177,7 @@ def refeshScreen(kx, ky):
         x.rect.width *= kx
         x.rect.height *= ky
 
-    fontnote = pygame.font.SysFont("sans", int(whiteboard.width/57))
+    fontnote = fontCache.font(int(whiteboard.width/57))
     note0 = fontnote.render("(free, busy, docu)", True, BLACK)
     note1 = fontnote.render("(free, busy, docu, wait, inside, done)", True, BLACK)
 
@@ -509,72 +1193,14 @@ def refeshScreen(kx, ky):
     for x in range(6):
         token3[x].rect = tokenRect[x]
 
-    graph0[0].scaling(kx, ky)
-    graph0[1].scaling(kx, ky)
-    graph1[0].scaling(kx, ky)
-    graph1[1].scaling(kx, ky)
-    graph2.scaling(kx, ky)
-    graph3[0].scaling(kx, ky)
-    graph3[1].scaling(kx, ky)
+    modes[1].note = modes[2].note = note0
+    modes[4].note = note1
+    nodewidth *= min(kx, ky)
+    for x in modes:
+        for y in x.graphs or ():
+            y.scaling(kx, ky)
 
-    if mode==0:
-        for x in guides:
-            x.draw(screen)
-    elif mode==1:
-        if activeGraph0==1: 
-            screen.blit(note0, whiteboard) 
-        petriButton.draw(screen)
-        tsButton.draw(screen)
-        text0.draw(screen)
-        text1.draw(screen)
-        text2.draw(screen)
-        text3.draw(screen)
-        text4.draw(screen)
-        text5.draw(screen)
-        for x in range(len(token0)):
-            token0[x].draw(screen)
-            upButtons[x].draw(screen)
-            downButtons[x].draw(screen)  
-        graph0[activeGraph0].draw(screen)
-    elif mode==2:
-        if activeGraph1==1: 
-            screen.blit(note0, whiteboard) 
-        petriButton.draw(screen)
-        tsButton.draw(screen)
-        text0.draw(screen)
-        text1.draw(screen)
-        text2.draw(screen)
-        for x in range(len(token1)):
-            token1[x].draw(screen)
-            upButtons[x].draw(screen)
-            downButtons[x].draw(screen)
-        graph1[activeGraph1].draw(screen)
-    elif mode==3:
-        text6.draw(screen)
-        text7.draw(screen)
-        text8.draw(screen)
-        for x in range(len(token2)):
-            token2[x].draw(screen)
-            upButtons[x + 3].draw(screen)
-            downButtons[x + 3].draw(screen)
-        graph2.draw(screen)
-    elif mode==4:
-        if activeGraph3==1: 
-            screen.blit(note1, whiteboard) 
-        petriButton.draw(screen)
-        tsButton.draw(screen)
-        text0.draw(screen)
-        text1.draw(screen)
-        text2.draw(screen)
-        text6.draw(screen)
-        text7.draw(screen)
-        text8.draw(screen)
-        for x in range(len(token3)):
-            token3[x].draw(screen)
-            upButtons[x].draw(screen)
-            downButtons[x].draw(screen) 
-        graph3[activeGraph3].draw(screen)
-    if mode!=0: createButton.draw(screen) 
+    modes[mode].draw(screen)
 
     pygame.display.flip()
 
@@ -643,7 +1269,7 @@ guide4 = Button(pygame.Rect(whiteboard.left, guide3.rect.bottom, whiteboard.widt
 guides = [guide0, guide1, guide2, guide3, guide4]
 for x in guides:
     x.draw(screen)
-fontnote = pygame.font.SysFont("sans", 20)
+fontnote = fontCache.font(20)
 note0 = fontnote.render("(free, busy, docu)", True, BLACK)
 note1 = fontnote.render("(free, busy, docu, wait, inside, done)", True, BLACK)
 
@@ -672,769 +1298,172 @@ token3[3].name = "3"
 token3[5].name = "1"
 
 nodewidth = whiteboard.width/15
-##### init graph 0
-slotfree0 = Place(pygame.Rect(whiteboard.left + nodewidth, whiteboard.top + nodewidth, nodewidth, nodewidth), "slot free")
-slotbusy0 = Place(pygame.Rect(whiteboard.left, whiteboard.bottom - 2*nodewidth, nodewidth, nodewidth), "slot busy", 1)
-slotdocu0 = Place(pygame.Rect(whiteboard.left + nodewidth + whiteboard.height, whiteboard.top + nodewidth, nodewidth, nodewidth), "slot docu", 1)
-slotbusy0.rect.left = (slotfree0.rect.left + slotdocu0.rect.left)/2
-
-start0 = Transition(pygame.Rect(whiteboard.left, whiteboard.top, nodewidth, nodewidth), "start")
-start0.rect.left = (slotfree0.rect.left + slotbusy0.rect.left)/2
-start0.rect.top = (slotfree0.rect.top + slotbusy0.rect.top)/2
-change0 = Transition(pygame.Rect(whiteboard.left, whiteboard.top, nodewidth, nodewidth), "change")
-change0.rect.left = (slotbusy0.rect.left + slotdocu0.rect.left)/2
-change0.rect.top = (slotbusy0.rect.top + slotdocu0.rect.top)/2
-end0 = Transition(pygame.Rect(whiteboard.left, whiteboard.top + nodewidth, nodewidth, nodewidth), "end")
-end0.rect.left = (slotdocu0.rect.left + slotfree0.rect.left)/2
-
-free0 = Place(pygame.Rect(whiteboard.left, whiteboard.top, nodewidth, nodewidth), "free", 1)
-free0.rect.left = (start0.rect.left + end0.rect.left)/2
-free0.rect.top = (start0.rect.top + end0.rect.top)/2
-busy0 = Place(pygame.Rect(whiteboard.left, start0.rect.top, nodewidth, nodewidth), "busy", 1)
-busy0.rect.left = (start0.rect.left + change0.rect.left)/2
-docu0 = Place(pygame.Rect(whiteboard.left, whiteboard.top, nodewidth, nodewidth), "docu")
-docu0.rect.left = (change0.rect.left + end0.rect.left)/2
-docu0.rect.top = (change0.rect.top + end0.rect.top)/2
-
-petri0 = PetriNet()
-petri0.places = {slotfree0.name : slotfree0, slotbusy0.name : slotbusy0, slotdocu0.name : slotdocu0, free0.name : free0, busy0.name : busy0, docu0.name : docu0}
-petri0.transitions = {start0.name : start0, change0.name : change0, end0.name : end0}
-
-petri0.adjList[slotfree0.name] = {end0.name : Arc("1")}
-petri0.adjList[slotbusy0.name] = {start0.name : Arc("1")}
-petri0.adjList[slotdocu0.name] = {change0.name : Arc("1")}
-petri0.adjList[free0.name] = {start0.name : Arc("1")}
-petri0.adjList[busy0.name] = {change0.name : Arc("1")}
-petri0.adjList[docu0.name] = {end0.name : Arc("1")}
-petri0.adjList[start0.name] = {slotfree0.name : Arc("1"), busy0.name : Arc("1")}
-petri0.adjList[change0.name] = {slotbusy0.name : Arc("1"), docu0.name : Arc("1")}
-petri0.adjList[end0.name] = {slotdocu0.name : Arc("1"), free0.name : Arc("1")}
-
-graph0 = [petri0]
-graph0.append(graph0[0].reachabilityGraph(("free", "busy", "docu")))
-graph0[1].autoScale(whiteboard)
-activeGraph0 = 0
-###
-###### init graph 1
-free1 = Place(pygame.Rect(whiteboard.left + nodewidth, whiteboard.top + nodewidth, nodewidth, nodewidth), "free", 4)
-docu1 = Place(pygame.Rect(whiteboard.right - 2*nodewidth, whiteboard.top + nodewidth, nodewidth, nodewidth), "docu")
-start1 = Transition(pygame.Rect(whiteboard.left + nodewidth, whiteboard.bottom - 2*nodewidth, nodewidth, nodewidth), "start")
-change1 = Transition(pygame.Rect(whiteboard.right - 2*nodewidth, whiteboard.bottom - 2*nodewidth, nodewidth, nodewidth), "change")
-end1 = Transition(pygame.Rect((free1.rect.left + docu1.rect.left)/2, whiteboard.top + nodewidth, nodewidth,nodewidth), "end")
-busy1 = Place(pygame.Rect(end1.rect.left, whiteboard.bottom - 2*nodewidth, nodewidth, nodewidth), "busy")
-graph1 = [PetriNet()]
-graph1[0].places = {free1.name : free1, busy1.name : busy1, docu1.name : docu1}
-graph1[0].transitions = {start1.name : start1, change1.name : change1, end1.name : end1}
-graph1[0].adjList[free1.name] = {start1.name : Arc("1")}
-graph1[0].adjList[start1.name] = {busy1.name : Arc("1")}
-graph1[0].adjList[busy1.name] = {change1.name : Arc("1")}
-graph1[0].adjList[change1.name] = {docu1.name : Arc("1")}
-graph1[0].adjList[docu1.name] = {end1.name : Arc("1")}
-graph1[0].adjList[end1.name] = {free1.name : Arc("1")}
-
-graph1.append(graph1[0].reachabilityGraph(("free", "busy", "docu")))
-graph1[1].autoScale(whiteboard)
-activeGraph1 = 0
-####
-#### init graph 2
-wait2 = Place(pygame.Rect(whiteboard.left + nodewidth, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "wait", 5)
-done2 = Place(pygame.Rect(whiteboard.right - 2*nodewidth, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "done", 1)
-inside2 = Place(pygame.Rect((wait2.rect.left + done2.rect.left)/2, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "inside")
-start2 = Transition(pygame.Rect((wait2.rect.left + inside2.rect.left)/2, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "start")
-change2 = Transition(pygame.Rect((inside2.rect.left + done2.rect.left)/2, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "change")
-graph2 = PetriNet()
-graph2.places = {wait2.name : wait2, inside2.name : inside2, done2.name : done2}
-graph2.transitions = {start2.name : start2, change2.name : change2}
-graph2.adjList[wait2.name] = {start2.name : Arc("1")}
-graph2.adjList[start2.name] = {inside2.name : Arc("1")}
-graph2.adjList[inside2.name] = {change2.name : Arc("1")}
-graph2.adjList[change2.name] = {done2.name : Arc("1")}
-graph2.adjList[done2.name] = {}
-
-###
-##### init graph 3
-wait3 = Place(pygame.Rect(whiteboard.left + nodewidth, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "wait", 3)
-done3 = Place(pygame.Rect(whiteboard.right - 2*nodewidth, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "done", 1)
-busy3 = Place(pygame.Rect((wait3.rect.left + done3.rect.left)/2, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "busy")
-inside3 = Place(pygame.Rect((wait3.rect.left + done3.rect.left)/2, whiteboard.bottom - 2*nodewidth, nodewidth, nodewidth), "inside")
-start3 = Transition(pygame.Rect((wait3.rect.left + inside3.rect.left)/2, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "start")
-change3 = Transition(pygame.Rect((inside3.rect.left + done3.rect.left)/2, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "change")
-free3 = Place(pygame.Rect(start3.rect.left, whiteboard.top + nodewidth, nodewidth, nodewidth), "free", 1)
-end3 = Transition(pygame.Rect(busy3.rect.left, whiteboard.top + nodewidth, nodewidth, nodewidth), "end")
-docu3 = Place(pygame.Rect(change3.rect.left, whiteboard.top + nodewidth, nodewidth, nodewidth), "docu")
-graph3 = [PetriNet()]
-graph3[0].places = {wait3.name : wait3, inside3.name : inside3, done3.name : done3, free3.name : free3, busy3.name : busy3, docu3.name : docu3}
-graph3[0].transitions = {start3.name : start3, change3.name : change3, end3.name : end3}
-graph3[0].adjList[wait3.name] = {start3.name : Arc("1")}
-graph3[0].adjList[inside3.name] = {change3.name : Arc("1")}
-graph3[0].adjList[done3.name] = {}
-graph3[0].adjList[free3.name] = {start3.name : Arc("1")}
-graph3[0].adjList[busy3.name] = {change3.name : Arc("1")}
-graph3[0].adjList[docu3.name] = {end3.name : Arc("1")}
-graph3[0].adjList[start3.name] = {busy3.name : Arc("1"), inside3.name : Arc("1")}
-graph3[0].adjList[change3.name] = {done3.name : Arc("1"), docu3.name : Arc("1")}
-graph3[0].adjList[end3.name] = {free3.name : Arc("1")}
-
-graph3.append(graph3[0].reachabilityGraph(("free", "busy", "docu", "wait", "inside", "done")))
-graph3[1].autoScale(whiteboard)
-activeGraph3 = 0
+
+def initGraph0():    # build the Petri Net of Question 1b/i, the first time its mode is used (see Mode.load)
+    slotfree0 = Place(pygame.Rect(whiteboard.left + nodewidth, whiteboard.top + nodewidth, nodewidth, nodewidth), "slot free")
+    slotbusy0 = Place(pygame.Rect(whiteboard.left, whiteboard.bottom - 2*nodewidth, nodewidth, nodewidth), "slot busy", 1)
+    slotdocu0 = Place(pygame.Rect(whiteboard.left + nodewidth + whiteboard.height, whiteboard.top + nodewidth, nodewidth, nodewidth), "slot docu", 1)
+    slotbusy0.rect.left = (slotfree0.rect.left + slotdocu0.rect.left)/2
+
+    start0 = Transition(pygame.Rect(whiteboard.left, whiteboard.top, nodewidth, nodewidth), "start")
+    start0.rect.left = (slotfree0.rect.left + slotbusy0.rect.left)/2
+    start0.rect.top = (slotfree0.rect.top + slotbusy0.rect.top)/2
+    change0 = Transition(pygame.Rect(whiteboard.left, whiteboard.top, nodewidth, nodewidth), "change")
+    change0.rect.left = (slotbusy0.rect.left + slotdocu0.rect.left)/2
+    change0.rect.top = (slotbusy0.rect.top + slotdocu0.rect.top)/2
+    end0 = Transition(pygame.Rect(whiteboard.left, whiteboard.top + nodewidth, nodewidth, nodewidth), "end")
+    end0.rect.left = (slotdocu0.rect.left + slotfree0.rect.left)/2
+
+    free0 = Place(pygame.Rect(whiteboard.left, whiteboard.top, nodewidth, nodewidth), "free", 1)
+    free0.rect.left = (start0.rect.left + end0.rect.left)/2
+    free0.rect.top = (start0.rect.top + end0.rect.top)/2
+    busy0 = Place(pygame.Rect(whiteboard.left, start0.rect.top, nodewidth, nodewidth), "busy", 1)
+    busy0.rect.left = (start0.rect.left + change0.rect.left)/2
+    docu0 = Place(pygame.Rect(whiteboard.left, whiteboard.top, nodewidth, nodewidth), "docu")
+    docu0.rect.left = (change0.rect.left + end0.rect.left)/2
+    docu0.rect.top = (change0.rect.top + end0.rect.top)/2
+
+    petri0 = PetriNet()
+    petri0.places = {slotfree0.name : slotfree0, slotbusy0.name : slotbusy0, slotdocu0.name : slotdocu0, free0.name : free0, busy0.name : busy0, docu0.name : docu0}
+    petri0.transitions = {start0.name : start0, change0.name : change0, end0.name : end0}
+
+    petri0.adjList[slotfree0.name] = {end0.name : Arc("1")}
+    petri0.adjList[slotbusy0.name] = {start0.name : Arc("1")}
+    petri0.adjList[slotdocu0.name] = {change0.name : Arc("1")}
+    petri0.adjList[free0.name] = {start0.name : Arc("1")}
+    petri0.adjList[busy0.name] = {change0.name : Arc("1")}
+    petri0.adjList[docu0.name] = {end0.name : Arc("1")}
+    petri0.adjList[start0.name] = {slotfree0.name : Arc("1"), busy0.name : Arc("1")}
+    petri0.adjList[change0.name] = {slotbusy0.name : Arc("1"), docu0.name : Arc("1")}
+    petri0.adjList[end0.name] = {slotdocu0.name : Arc("1"), free0.name : Arc("1")}
+
+    return petri0
+
+def initGraph1():    # build the Petri Net of Question 1b/ii
+    free1 = Place(pygame.Rect(whiteboard.left + nodewidth, whiteboard.top + nodewidth, nodewidth, nodewidth), "free", 4)
+    docu1 = Place(pygame.Rect(whiteboard.right - 2*nodewidth, whiteboard.top + nodewidth, nodewidth, nodewidth), "docu")
+    start1 = Transition(pygame.Rect(whiteboard.left + nodewidth, whiteboard.bottom - 2*nodewidth, nodewidth, nodewidth), "start")
+    change1 = Transition(pygame.Rect(whiteboard.right - 2*nodewidth, whiteboard.bottom - 2*nodewidth, nodewidth, nodewidth), "change")
+    end1 = Transition(pygame.Rect((free1.rect.left + docu1.rect.left)/2, whiteboard.top + nodewidth, nodewidth,nodewidth), "end")
+    busy1 = Place(pygame.Rect(end1.rect.left, whiteboard.bottom - 2*nodewidth, nodewidth, nodewidth), "busy")
+    petri1 = PetriNet()
+    petri1.places = {free1.name : free1, busy1.name : busy1, docu1.name : docu1}
+    petri1.transitions = {start1.name : start1, change1.name : change1, end1.name : end1}
+    petri1.adjList[free1.name] = {start1.name : Arc("1")}
+    petri1.adjList[start1.name] = {busy1.name : Arc("1")}
+    petri1.adjList[busy1.name] = {change1.name : Arc("1")}
+    petri1.adjList[change1.name] = {docu1.name : Arc("1")}
+    petri1.adjList[docu1.name] = {end1.name : Arc("1")}
+    petri1.adjList[end1.name] = {free1.name : Arc("1")}
+
+    return petri1
+
+def initGraph2():    # build the Petri Net of Question 2
+    wait2 = Place(pygame.Rect(whiteboard.left + nodewidth, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "wait", 5)
+    done2 = Place(pygame.Rect(whiteboard.right - 2*nodewidth, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "done", 1)
+    inside2 = Place(pygame.Rect((wait2.rect.left + done2.rect.left)/2, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "inside")
+    start2 = Transition(pygame.Rect((wait2.rect.left + inside2.rect.left)/2, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "start")
+    change2 = Transition(pygame.Rect((inside2.rect.left + done2.rect.left)/2, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "change")
+    petri2 = PetriNet()
+    petri2.places = {wait2.name : wait2, inside2.name : inside2, done2.name : done2}
+    petri2.transitions = {start2.name : start2, change2.name : change2}
+    petri2.adjList[wait2.name] = {start2.name : Arc("1")}
+    petri2.adjList[start2.name] = {inside2.name : Arc("1")}
+    petri2.adjList[inside2.name] = {change2.name : Arc("1")}
+    petri2.adjList[change2.name] = {done2.name : Arc("1")}
+    petri2.adjList[done2.name] = {}
+    return petri2
+
+def initGraph3():    # build the Petri Net of Question 3 & 4
+    wait3 = Place(pygame.Rect(whiteboard.left + nodewidth, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "wait", 3)
+    done3 = Place(pygame.Rect(whiteboard.right - 2*nodewidth, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "done", 1)
+    busy3 = Place(pygame.Rect((wait3.rect.left + done3.rect.left)/2, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "busy")
+    inside3 = Place(pygame.Rect((wait3.rect.left + done3.rect.left)/2, whiteboard.bottom - 2*nodewidth, nodewidth, nodewidth), "inside")
+    start3 = Transition(pygame.Rect((wait3.rect.left + inside3.rect.left)/2, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "start")
+    change3 = Transition(pygame.Rect((inside3.rect.left + done3.rect.left)/2, whiteboard.top + whiteboard.height/2 - nodewidth/2, nodewidth, nodewidth), "change")
+    free3 = Place(pygame.Rect(start3.rect.left, whiteboard.top + nodewidth, nodewidth, nodewidth), "free", 1)
+    end3 = Transition(pygame.Rect(busy3.rect.left, whiteboard.top + nodewidth, nodewidth, nodewidth), "end")
+    docu3 = Place(pygame.Rect(change3.rect.left, whiteboard.top + nodewidth, nodewidth, nodewidth), "docu")
+    petri3 = PetriNet()
+    petri3.places = {wait3.name : wait3, inside3.name : inside3, done3.name : done3, free3.name : free3, busy3.name : busy3, docu3.name : docu3}
+    petri3.transitions = {start3.name : start3, change3.name : change3, end3.name : end3}
+    petri3.adjList[wait3.name] = {start3.name : Arc("1")}
+    petri3.adjList[inside3.name] = {change3.name : Arc("1")}
+    petri3.adjList[done3.name] = {}
+    petri3.adjList[free3.name] = {start3.name : Arc("1")}
+    petri3.adjList[busy3.name] = {change3.name : Arc("1")}
+    petri3.adjList[docu3.name] = {end3.name : Arc("1")}
+    petri3.adjList[start3.name] = {busy3.name : Arc("1"), inside3.name : Arc("1")}
+    petri3.adjList[change3.name] = {done3.name : Arc("1"), docu3.name : Arc("1")}
+    petri3.adjList[end3.name] = {free3.name : Arc("1")}
+
+    return petri3
 
 running = True
 mode = 0
-
-# main loop
+modes = [Guide(guides),     # dispatch table of the workspace pages, indexed by the mode of the left buttons
+    Mode(initGraph0, token0, 0, [text0, text1, text2, text3, text4, text5], lambda t: {"free" : t[0], "busy" : t[1], "docu" : t[2], "slot free" : t[3] - t[0], "slot busy" : t[4] - t[1], "slot docu" : t[5] - t[2]}, ("free", "busy", "docu"), note0, True),
+    Mode(initGraph1, token1, 0, [text0, text1, text2], lambda t: dict(zip(("free", "busy", "docu"), t)), ("free", "busy", "docu"), note0),
+    Mode(initGraph2, token2, 3, [text6, text7, text8], lambda t: dict(zip(("wait", "inside", "done"), t))),
+    Mode(initGraph3, token3, 0, [text0, text1, text2, text6, text7, text8], lambda t: dict(zip(("free", "busy", "docu", "wait", "inside", "done"), t)), ("free", "busy", "docu", "wait", "inside", "done"), note1)]
+dragged = None  # (PetriNet or TransitionSystem, node key, node widget, note under the TS) of the node held by the mouse, see grab()
+panning = False # True while the right or middle button drags the camera of the TS
+clock = pygame.time.Clock()
+
+# main loop, it sleeps in pygame.event.wait until something happens and only runs at FPS while the mouse moves a node or the camera
 while running:
-    mouse_x, mouse_y = pygame.mouse.get_pos()
-    if mode==1:
-        isMoved = 0
-        if activeGraph0==0:
-            for x in graph0[0].places.values():
-                if x.isClicked:
-                    relx, rely = pygame.mouse.get_rel()
-                    if relx < 0:
-                        if x.rect.left + relx < whiteboard.left:
-                            x.rect.left = whiteboard.left
-                        else:
-                            x.rect.left += relx
-                    else:
-                        if x.rect.right + relx > whiteboard.right:
-                            x.rect.right = whiteboard.right
-                        else: x.rect.right += relx
-                    if rely < 0:
-                        if x.rect.top + rely < whiteboard.top:
-                            x.rect.top = whiteboard.top
-                        else: x.rect.top += rely
-                    else:
-                        if x.rect.bottom + rely > whiteboard.bottom:
-                            x.rect.bottom = whiteboard.bottom
-                        else: x.rect.bottom +=rely
-                    isMoved = 1
-                    break
-            for x in graph0[0].transitions.values():
-                if x.isMoving:
-                    relx, rely = pygame.mouse.get_rel()
-                    if relx < 0:
-                        if x.rect.left + relx < whiteboard.left:
-                            x.rect.left = whiteboard.left
-                        else:
-                            x.rect.left += relx
-                    else:
-                        if x.rect.right + relx > whiteboard.right:
-                            x.rect.right = whiteboard.right
-                        else: x.rect.right += relx
-                    if rely < 0:
-                        if x.rect.top + rely < whiteboard.top:
-                            x.rect.top = whiteboard.top
-                        else: x.rect.top += rely
-                    else:
-                        if x.rect.bottom + rely > whiteboard.bottom:
-                            x.rect.bottom = whiteboard.bottom
-                        else: x.rect.bottom += rely
-                    isMoved = 1
-                    break
-                elif x.isClicked:
-                    relx, rely = pygame.mouse.get_rel()
-                    if relx*relx + rely*rely > 4:
-                        x.isMoving = 1
-                        if relx < 0:
-                            if x.rect.left + relx < whiteboard.left:
-                                x.rect.left = whiteboard.left
-                            else:
-                                x.rect.left += relx
-                        else:
-                            if x.rect.right + relx > whiteboard.right:
-                                x.rect.right = whiteboard.right
-                            else: x.rect.right += relx
-                        if rely < 0:
-                            if x.rect.top + rely < whiteboard.top:
-                                x.rect.top = whiteboard.top
-                            else: x.rect.top += rely
-                        else:
-                            if x.rect.bottom + rely > whiteboard.bottom:
-                                x.rect.bottom = whiteboard.bottom
-                            else: x.rect.bottom +=rely
-                        isMoved = 1
-                        break
-        else: 
-            for x in graph0[1].states.values():
-                if x.isClicked:
-                    relx, rely = pygame.mouse.get_rel()
-                    if relx < 0:
-                        if x.rect.left + relx < whiteboard.left:
-                            x.rect.left = whiteboard.left
-                        else:
-                            x.rect.left += relx
-                    else:
-                        if x.rect.right + relx > whiteboard.right:
-                            x.rect.right = whiteboard.right
-                        else: x.rect.right += relx
-                    if rely < 0:
-                        if x.rect.top + rely < whiteboard.top:
-                            x.rect.top = whiteboard.top
-                        else: x.rect.top += rely
-                    else:
-                        if x.rect.bottom + rely > whiteboard.bottom:
-                            x.rect.bottom = whiteboard.bottom
-                        else: x.rect.bottom +=rely
-                    isMoved = 1
-                    break
-        if isMoved:
-            pygame.draw.rect(screen, WHITE, whiteboard)
-            if activeGraph0==1: screen.blit(note0, whiteboard) 
-            graph0[activeGraph0].draw(screen)
-            pygame.display.update(whiteboard)
-    elif mode==2:
-        isMoved = 0
-        if activeGraph1==0:
-            for x in graph1[0].places.values():
-                if x.isClicked:
-                    relx, rely = pygame.mouse.get_rel()
-                    if relx < 0:
-                        if x.rect.left + relx < whiteboard.left:
-                            x.rect.left = whiteboard.left
-                        else:
-                            x.rect.left += relx
-                    else:
-                        if x.rect.right + relx > whiteboard.right:
-                            x.rect.right = whiteboard.right
-                        else: x.rect.right += relx
-                    if rely < 0:
-                        if x.rect.top + rely < whiteboard.top:
-                            x.rect.top = whiteboard.top
-                        else: x.rect.top += rely
-                    else:
-                        if x.rect.bottom + rely > whiteboard.bottom:
-                            x.rect.bottom = whiteboard.bottom
-                        else: x.rect.bottom +=rely
-                    isMoved = 1
-                    break
-            for x in graph1[0].transitions.values():
-                if x.isMoving:
-                    relx, rely = pygame.mouse.get_rel()
-                    if relx < 0:
-                        if x.rect.left + relx < whiteboard.left:
-                            x.rect.left = whiteboard.left
-                        else:
-                            x.rect.left += relx
-                    else:
-                        if x.rect.right + relx > whiteboard.right:
-                            x.rect.right = whiteboard.right
-                        else: x.rect.right += relx
-                    if rely < 0:
-                        if x.rect.top + rely < whiteboard.top:
-                            x.rect.top = whiteboard.top
-                        else: x.rect.top += rely
-                    else:
-                        if x.rect.bottom + rely > whiteboard.bottom:
-                            x.rect.bottom = whiteboard.bottom
-                        else: x.rect.bottom += rely
-                    isMoved = 1
-                    break
-                elif x.isClicked:
-                    relx, rely = pygame.mouse.get_rel()
-                    if relx*relx + rely*rely > 4:
-                        x.isMoving = 1
-                        if relx < 0:
-                            if x.rect.left + relx < whiteboard.left:
-                                x.rect.left = whiteboard.left
-                            else:
-                                x.rect.left += relx
-                        else:
-                            if x.rect.right + relx > whiteboard.right:
-                                x.rect.right = whiteboard.right
-                            else: x.rect.right += relx
-                        if rely < 0:
-                            if x.rect.top + rely < whiteboard.top:
-                                x.rect.top = whiteboard.top
-                            else: x.rect.top += rely
-                        else:
-                            if x.rect.bottom + rely > whiteboard.bottom:
-                                x.rect.bottom = whiteboard.bottom
-                            else: x.rect.bottom += rely
-                        isMoved = 1
-                        break
-        else: 
-            for x in graph1[1].states.values():
-                if x.isClicked:
-                    relx, rely = pygame.mouse.get_rel()
-                    if relx < 0:
-                        if x.rect.left + relx < whiteboard.left:
-                            x.rect.left = whiteboard.left
-                        else:
-                            x.rect.left += relx
-                    else:
-                        if x.rect.right + relx > whiteboard.right:
-                            x.rect.right = whiteboard.right
-                        else: x.rect.right += relx
-                    if rely < 0:
-                        if x.rect.top + rely < whiteboard.top:
-                            x.rect.top = whiteboard.top
-                        else: x.rect.top += rely
-                    else:
-                        if x.rect.bottom + rely > whiteboard.bottom:
-                            x.rect.bottom = whiteboard.bottom
-                        else: x.rect.bottom +=rely
-                    isMoved = 1
-                    break
-        if isMoved:
-            pygame.draw.rect(screen, WHITE, whiteboard)
-            if activeGraph1==1: screen.blit(note0, whiteboard) 
-            graph1[activeGraph1].draw(screen)
-            pygame.display.update(whiteboard)
-    elif mode==3:
-        isMoved = 0
-        for x in graph2.places.values():
-            if x.isClicked:
-                relx, rely = pygame.mouse.get_rel()
-                if relx < 0:
-                    if x.rect.left + relx < whiteboard.left:
-                        x.rect.left = whiteboard.left
-                    else:
-                        x.rect.left += relx
-                else:
-                    if x.rect.right + relx > whiteboard.right:
-                        x.rect.right = whiteboard.right
-                    else: x.rect.right += relx
-                if rely < 0:
-                    if x.rect.top + rely < whiteboard.top:
-                        x.rect.top = whiteboard.top
-                    else: x.rect.top += rely
-                else:
-                    if x.rect.bottom + rely > whiteboard.bottom:
-                        x.rect.bottom = whiteboard.bottom
-                    else: x.rect.bottom += rely
-                isMoved = 1
-                break
-        for x in graph2.transitions.values():
-            if x.isMoving:
-                relx, rely = pygame.mouse.get_rel()
-                if relx < 0:
-                    if x.rect.left + relx < whiteboard.left:
-                        x.rect.left = whiteboard.left
-                    else:
-                        x.rect.left += relx
-                else:
-                    if x.rect.right + relx > whiteboard.right:
-                        x.rect.right = whiteboard.right
-                    else: x.rect.right += relx
-                if rely < 0:
-                    if x.rect.top + rely < whiteboard.top:
-                        x.rect.top = whiteboard.top
-                    else: x.rect.top += rely
-                else:
-                    if x.rect.bottom + rely > whiteboard.bottom:
-                        x.rect.bottom = whiteboard.bottom
-                    else: x.rect.bottom += rely
-                isMoved = 1
-                break
-            elif x.isClicked:
-                relx, rely = pygame.mouse.get_rel()
-                if relx*relx + rely*rely > 4:
-                    x.isMoving = 1
-                    if relx < 0:
-                        if x.rect.left + relx < whiteboard.left:
-                            x.rect.left = whiteboard.left
-                        else:
-                            x.rect.left += relx
-                    else:
-                        if x.rect.right + relx > whiteboard.right:
-                            x.rect.right = whiteboard.right
-                        else: x.rect.right += relx
-                    if rely < 0:
-                        if x.rect.top + rely < whiteboard.top:
-                            x.rect.top = whiteboard.top
-                        else: x.rect.top += rely
-                    else:
-                        if x.rect.bottom + rely > whiteboard.bottom:
-                            x.rect.bottom = whiteboard.bottom
-                        else: x.rect.bottom += rely
-                    isMoved = 1
-                    break
-
-        if isMoved:
-            pygame.draw.rect(screen, WHITE, whiteboard)
-            graph2.draw(screen)
-            pygame.display.update(whiteboard)
-    elif mode==4:
-        isMoved = 0
-        if activeGraph3==0:
-            for x in graph3[0].places.values():
-                if x.isClicked:
-                    relx, rely = pygame.mouse.get_rel()
-                    if relx < 0:
-                        if x.rect.left + relx < whiteboard.left:
-                            x.rect.left = whiteboard.left
-                        else:
-                            x.rect.left += relx
-                    else:
-                        if x.rect.right + relx > whiteboard.right:
-                            x.rect.right = whiteboard.right
-                        else: x.rect.right += relx
-                    if rely < 0:
-                        if x.rect.top + rely < whiteboard.top:
-                            x.rect.top = whiteboard.top
-                        else: x.rect.top += rely
-                    else:
-                        if x.rect.bottom + rely > whiteboard.bottom:
-                            x.rect.bottom = whiteboard.bottom
-                        else: x.rect.bottom +=rely
-                    isMoved = 1
-                    break
-            for x in graph3[0].transitions.values():
-                if x.isMoving:
-                    relx, rely = pygame.mouse.get_rel()
-                    if relx < 0:
-                        if x.rect.left + relx < whiteboard.left:
-                            x.rect.left = whiteboard.left
-                        else:
-                            x.rect.left += relx
-                    else:
-                        if x.rect.right + relx > whiteboard.right:
-                            x.rect.right = whiteboard.right
-                        else: x.rect.right += relx
-                    if rely < 0:
-                        if x.rect.top + rely < whiteboard.top:
-                            x.rect.top = whiteboard.top
-                        else: x.rect.top += rely
-                    else:
-                        if x.rect.bottom + rely > whiteboard.bottom:
-                            x.rect.bottom = whiteboard.bottom
-                        else: x.rect.bottom +=rely
-                    isMoved = 1
-                    break
-                elif x.isClicked:
-                    relx, rely = pygame.mouse.get_rel()
-                    if relx*relx + rely*rely > 4:
-                        x.isMoving = 1
-                        relx, rely = pygame.mouse.get_rel()
-                        if relx < 0:
-                            if x.rect.left + relx < whiteboard.left:
-                                x.rect.left = whiteboard.left
-                            else:
-                                x.rect.left += relx
-                        else:
-                            if x.rect.right + relx > whiteboard.right:
-                                x.rect.right = whiteboard.right
-                            else: x.rect.right += relx
-                        if rely < 0:
-                            if x.rect.top + rely < whiteboard.top:
-                                x.rect.top = whiteboard.top
-                            else: x.rect.top += rely
-                        else:
-                            if x.rect.bottom + rely > whiteboard.bottom:
-                                x.rect.bottom = whiteboard.bottom
-                            else: x.rect.bottom += rely
-                        isMoved = 1
-                        break
-        else: 
-            for x in graph3[1].states.values():
-                if x.isClicked:
-                    relx, rely = pygame.mouse.get_rel()
-                    if relx < 0:
-                        if x.rect.left + relx < whiteboard.left:
-                            x.rect.left = whiteboard.left
-                        else:
-                            x.rect.left += relx
-                    else:
-                        if x.rect.right + relx > whiteboard.right:
-                            x.rect.right = whiteboard.right
-                        else: x.rect.right += relx
-                    if rely < 0:
-                        if x.rect.top + rely < whiteboard.top:
-                            x.rect.top = whiteboard.top
-                        else: x.rect.top += rely
-                    else:
-                        if x.rect.bottom + rely > whiteboard.bottom:
-                            x.rect.bottom = whiteboard.bottom
-                        else: x.rect.bottom +=rely
-                    isMoved = 1
-                    break
-        if isMoved:
-            pygame.draw.rect(screen, WHITE, whiteboard)
-            if activeGraph3==1: screen.blit(note1, whiteboard) 
-            graph3[activeGraph3].draw(screen)
-            pygame.display.update(whiteboard)
-    # event handling, gets all event from the event queue
-    for event in pygame.event.get():
+    if dragged is not None or panning:
+        clock.tick(FPS)
+        events = pygame.event.get()
+    elif coldMode() is not None and not pygame.event.peek():    # nothing to do, prepare a mode the user has not opened yet
+        coldMode().warm(screen)
+        events = pygame.event.get()
+    elif building():    # wake up to show the states found by the background build
+        events = [pygame.event.wait(BUILDWAIT)] + pygame.event.get()
+    else:
+        events = [pygame.event.wait()] + pygame.event.get()
+    for x in modes:     # show the states found by the background builds
+        if x.build is not None and x.build.poll(whiteboard) and activeView()[0] is x.build.ts:
+            redrawView(*activeView())
+    if panning:     # move the camera of the TS with the mouse
+        relx, rely = pygame.mouse.get_rel()
+        ts, note = activeView()
+        if ts is not None and (relx or rely):
+            ts.camera.pan(relx, rely)
+            redrawView(ts, note)
+    if dragged is not None: # move the dragged node with the mouse
+        source, key, x, note = dragged
+        relx, rely = pygame.mouse.get_rel()
+        if not isinstance(x, Transition) or x.isMoving or relx*relx + rely*rely > 4:   # a transition only moves after a real drag, a click fires it
+            if isinstance(x, Transition): x.isMoving = 1
+            source.moveBy(key, relx, rely, whiteboard)
+            scene = source.scene(whiteboard, note)
+            scene.touch(key)
+            pygame.display.update(scene.flush(screen))
+    # event handling, the events that came since the last frame
+    for event in events:
         # only do something if the event is of type QUIT
         if event.type == pygame.QUIT:
             # change the value to False, to exit the main loop
             running = False
+        elif event.type == pygame.MOUSEWHEEL:   # zoom the TS around the mouse
+            ts, note = activeView()
+            pos = pygame.mouse.get_pos()
+            if ts is not None and whiteboard.collidepoint(pos):
+                ts.camera.zoomAt(pos, 1.25**event.y)
+                redrawView(ts, note)
+        elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP) and event.button != 1:    # other buttons pan the TS, the wheel also sends buttons 4 and 5
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button in (2, 3) and activeView()[0] is not None and whiteboard.collidepoint(event.pos):
+                panning = True
+                pygame.mouse.get_rel()
+            elif event.type == pygame.MOUSEBUTTONUP:
+                panning = False
         elif event.type == pygame.MOUSEBUTTONDOWN:
-            if workspace.collidepoint(mouse_x, mouse_y): 
-                if mode == 1:
-                    if taskbar.collidepoint(mouse_x, mouse_y):
-                        if createButton.rect.collidepoint(mouse_x, mouse_y):
-                            createButton.active = 1
-                            createButton.draw(screen)
-                            pygame.display.update(createButton.rect)
-                            dict = {"free" : int(token0[0].name), "busy" : int(token0[1].name), "docu" : int(token0[2].name), "slot free" : int(token0[3].name) - int(token0[0].name), "slot busy" : int(token0[4].name) - int(token0[1].name), "slot docu" : int(token0[5].name) - int(token0[2].name)}
-                            graph0[0].setMarking(dict)
-                            graph0[1] = graph0[0].reachabilityGraph(("free", "busy", "docu"))
-                            graph0[1].autoScale(whiteboard)
-                            pygame.draw.rect(screen, WHITE, whiteboard)
-                            graph0[0].draw(screen)
-                            if activeGraph0==1:
-                                petriButton.active = 1
-                                tsButton.active = 0
-                                petriButton.draw(screen)
-                                tsButton.draw(screen)
-                                activeGraph0 = 0
-                            createButton.active = 0
-                            createButton.draw(screen)
-                            pygame.display.update(workspace)
-                        elif petriButton.rect.collidepoint(mouse_x, mouse_y):
-                            if activeGraph0==1:
-                                petriButton.active = 1
-                                tsButton.active = 0
-                                petriButton.draw(screen)
-                                tsButton.draw(screen)
-                                pygame.draw.rect(screen, WHITE, whiteboard)
-                                graph0[0].draw(screen)
-                                pygame.display.update(workspace)
-                                activeGraph0 = 0
-                        elif tsButton.rect.collidepoint(mouse_x, mouse_y):
-                            if activeGraph0==0:
-                                petriButton.active = 0
-                                tsButton.active = 1
-                                petriButton.draw(screen)
-                                tsButton.draw(screen)
-                                pygame.draw.rect(screen, WHITE, whiteboard)
-                                screen.blit(note0, whiteboard) 
-                                graph0[1].draw(screen)
-                                pygame.display.update(workspace)
-                                activeGraph0 = 1
-                        else:
-                            for x in range(len(token0)):
-                                if upButtons[x].rect.collidepoint(mouse_x, mouse_y):
-                                    newval = int(token0[x].name) + 1
-                                    token0[x].name = str(newval)
-                                    token0[x].draw(screen)
-                                    if x < 3 and newval > int(token0[x + 3].name):
-                                        token0[x + 3].name = str(newval)
-                                        token0[x + 3].draw(screen)
-                                        pygame.display.update((token0[x].rect, token0[x + 3].rect))
-                                    else: pygame.display.update(token0[x].rect)
-                                    break
-                                elif downButtons[x].rect.collidepoint(mouse_x, mouse_y):
-                                    newval = int(token0[x].name) - 1
-                                    if newval < 0: pass
-                                    elif x >= 3 and newval < int(token0[x - 3].name): pass
-                                    else: 
-                                        token0[x].name = str(newval)
-                                        token0[x].draw(screen)
-                                        pygame.display.update(token0[x].rect)
-                                    break
-                    elif whiteboard.collidepoint(mouse_x, mouse_y): 
-                        if activeGraph0==0:
-                            for x in graph0[0].places.values():
-                                if x.rect.collidepoint(mouse_x, mouse_y):
-                                    x.isClicked = 1
-                                    pygame.mouse.get_rel()
-                                    break
-                            for x in graph0[0].transitions.values():
-                                if x.rect.collidepoint(mouse_x, mouse_y):
-                                    x.isClicked = 1
-                                    pygame.mouse.get_rel()
-                                    break
-                        else:
-                            for x in graph0[1].states.values():
-                                if x.rect.collidepoint(mouse_x, mouse_y):
-                                    x.isClicked = 1
-                                    pygame.mouse.get_rel()
-                                    break
-                elif mode==2: 
-                    if taskbar.collidepoint(mouse_x, mouse_y): 
-                        if createButton.rect.collidepoint(mouse_x, mouse_y): 
-                            createButton.active = 1
-                            createButton.draw(screen)
-                            pygame.display.update(createButton.rect)
-                            dict = {"free" : int(token1[0].name), "busy" : int(token1[1].name), "docu" : int(token1[2].name)}
-                            graph1[0].setMarking(dict)
-                            graph1[1] = graph1[0].reachabilityGraph(("free", "busy", "docu"))
-                            graph1[1].autoScale(whiteboard)
-                            pygame.draw.rect(screen, WHITE, whiteboard)
-                            graph1[0].draw(screen)
-                            if activeGraph1==1:
-                                petriButton.active = 1
-                                tsButton.active = 0
-                                petriButton.draw(screen)
-                                tsButton.draw(screen)
-                                activeGraph1 = 0
-                            createButton.active = 0
-                            createButton.draw(screen)
-                            pygame.display.update(workspace)
-                        elif petriButton.rect.collidepoint(mouse_x, mouse_y): 
-                            if activeGraph1==1:
-                                petriButton.active = 1
-                                tsButton.active = 0
-                                petriButton.draw(screen)
-                                tsButton.draw(screen)
-                                pygame.draw.rect(screen, WHITE, whiteboard)
-                                graph1[0].draw(screen)
-                                pygame.display.update(workspace)
-                                activeGraph1 = 0
-                        elif tsButton.rect.collidepoint(mouse_x, mouse_y): 
-                            if activeGraph1==0:
-                                petriButton.active = 0
-                                tsButton.active = 1
-                                petriButton.draw(screen)
-                                tsButton.draw(screen)
-                                pygame.draw.rect(screen, WHITE, whiteboard)
-                                screen.blit(note0, whiteboard) 
-                                graph1[1].draw(screen)
-                                pygame.display.update(workspace)
-                                activeGraph1 = 1
-                        else:
-                            for x in range(len(token1)):
-                                if upButtons[x].rect.collidepoint(mouse_x, mouse_y):
-                                    token1[x].name = str(int(token1[x].name) + 1)
-                                    token1[x].draw(screen)
-                                    pygame.display.update(token1[x].rect)
-                                    break
-                                elif downButtons[x].rect.collidepoint(mouse_x, mouse_y):
-                                    newval = int(token1[x].name) - 1
-                                    if newval < 0: pass
-                                    else:
-                                        token1[x].name = str(newval)
-                                        token1[x].draw(screen)
-                                        pygame.display.update(token1[x].rect)
-                                    break
-                    elif whiteboard.collidepoint(mouse_x, mouse_y): 
-                        if activeGraph1==0:
-                            for x in graph1[0].places.values():
-                                if x.rect.collidepoint(mouse_x, mouse_y):
-                                    x.isClicked = 1
-                                    pygame.mouse.get_rel()
-                                    break
-                            for x in graph1[0].transitions.values():
-                                if x.rect.collidepoint(mouse_x, mouse_y):
-                                    x.isClicked = 1
-                                    pygame.mouse.get_rel()
-                                    break
-                        else:
-                            for x in graph1[1].states.values():
-                                if x.rect.collidepoint(mouse_x, mouse_y):
-                                    x.isClicked = 1
-                                    pygame.mouse.get_rel()
-                                    break
-                elif mode==3: 
-                    if taskbar.collidepoint(mouse_x, mouse_y): 
-                        if createButton.rect.collidepoint(mouse_x, mouse_y): 
-                            createButton.active = 1
-                            createButton.draw(screen)
-                            pygame.display.update(createButton.rect)
-                            dict = {"wait" : int(token2[0].name), "inside" : int(token2[1].name), "done" : int(token2[2].name)}
-                            graph2.setMarking(dict)
-                            pygame.draw.rect(screen, WHITE, whiteboard)
-                            graph2.draw(screen)
-                            createButton.active = 0
-                            createButton.draw(screen)
-                            pygame.display.update((createButton.rect, whiteboard))
-                        else:
-                            for x in range(len(token2)):
-                                if upButtons[x + 3].rect.collidepoint(mouse_x, mouse_y):
-                                    token2[x].name = str(int(token2[x].name) + 1)
-                                    token2[x].draw(screen)
-                                    pygame.display.update(token2[x].rect)
-                                    break
-                                elif downButtons[x + 3].rect.collidepoint(mouse_x, mouse_y):
-                                    newval = int(token2[x].name) - 1
-                                    if newval < 0: pass
-                                    else:
-                                        token2[x].name = str(newval)
-                                        token2[x].draw(screen)
-                                        pygame.display.update(token2[x].rect)
-                                    break
-                    elif whiteboard.collidepoint(mouse_x, mouse_y): 
-                        for x in graph2.places.values():
-                            if x.rect.collidepoint(mouse_x, mouse_y):
-                                x.isClicked = 1
-                                pygame.mouse.get_rel()
-                                break
-                        for x in graph2.transitions.values():
-                            if x.rect.collidepoint(mouse_x, mouse_y):
-                                x.isClicked = 1
-                                pygame.mouse.get_rel()
-                                break
-                elif mode==4: 
-                    if taskbar.collidepoint(mouse_x, mouse_y):
-                        if createButton.rect.collidepoint(mouse_x, mouse_y):
-                            createButton.active = 1
-                            createButton.draw(screen)
-                            pygame.display.update(createButton.rect)
-                            dict = {"free" : int(token3[0].name), "busy" : int(token3[1].name), "docu" : int(token3[2].name), "wait" : int(token3[3].name), "inside" : int(token3[4].name), "done" : int(token3[5].name)}
-                            graph3[0].setMarking(dict)
-                            graph3[1] = graph3[0].reachabilityGraph(("free", "busy", "docu", "wait", "inside", "done"))
-                            graph3[1].autoScale(whiteboard)
-                            pygame.draw.rect(screen, WHITE, whiteboard)
-                            graph3[0].draw(screen)
-                            if activeGraph3==1:
-                                petriButton.active = 1
-                                tsButton.active = 0
-                                petriButton.draw(screen)
-                                tsButton.draw(screen)
-                                activeGraph3 = 0
-                            createButton.active = 0
-                            createButton.draw(screen)
-                            pygame.display.update(workspace)
-                        elif petriButton.rect.collidepoint(mouse_x, mouse_y):
-                            if activeGraph3==1:
-                                petriButton.active = 1
-                                tsButton.active = 0
-                                petriButton.draw(screen)
-                                tsButton.draw(screen)
-                                pygame.draw.rect(screen, WHITE, whiteboard)
-                                graph3[0].draw(screen)
-                                pygame.display.update(workspace)
-                                activeGraph3 = 0
-                        elif tsButton.rect.collidepoint(mouse_x, mouse_y):
-                            if activeGraph3==0:
-                                petriButton.active = 0
-                                tsButton.active = 1
-                                petriButton.draw(screen)
-                                tsButton.draw(screen)
-                                pygame.draw.rect(screen, WHITE, whiteboard)
-                                screen.blit(note1, whiteboard) 
-                                graph3[1].draw(screen)
-                                pygame.display.update(workspace)
-                                activeGraph3 = 1
-                        else:
-                            for x in range(len(token3)):
-                                if upButtons[x].rect.collidepoint(mouse_x, mouse_y):
-                                    token3[x].name = str(int(token3[x].name) + 1)
-                                    token3[x].draw(screen)
-                                    pygame.display.update(token3[x].rect)
-                                    break
-                                elif downButtons[x].rect.collidepoint(mouse_x, mouse_y):
-                                    newval = int(token3[x].name) - 1
-                                    if newval < 0: pass
-                                    else:
-                                        token3[x].name = str(newval)
-                                        token3[x].draw(screen)
-                                        pygame.display.update(token3[x].rect)
-                                    break
-                    elif whiteboard.collidepoint(mouse_x, mouse_y): 
-                        if activeGraph3==0:
-                            for x in graph3[0].places.values():
-                                if x.rect.collidepoint(mouse_x, mouse_y):
-                                    x.isClicked = 1
-                                    pygame.mouse.get_rel()
-                                    break
-                            for x in graph3[0].transitions.values():
-                                if x.rect.collidepoint(mouse_x, mouse_y):
-                                    x.isClicked = 1
-                                    pygame.mouse.get_rel()
-                                    break
-                        else:
-                            for x in graph3[1].states.values():
-                                if x.rect.collidepoint(mouse_x, mouse_y):
-                                    x.isClicked = 1
-                                    pygame.mouse.get_rel()
-                                    break
+            if workspace.collidepoint(event.pos):
+                dragged = modes[mode].press(event.pos)
             else:
                 for x in range(len(wsButtons)):
-                    if wsButtons[x].rect.collidepoint(mouse_x, mouse_y) and x!=mode:
+                    if wsButtons[x].rect.collidepoint(event.pos) and x!=mode:
                         pygame.draw.rect(screen, NAVY, taskbar)
                         pygame.draw.rect(screen, WHITE, whiteboard)
                         wsButtons[x].active = 1
@@ -1442,169 +1471,26 @@ while running:
                         wsButtons[mode].active = 0
                         wsButtons[mode].draw(screen)
                         mode = x
-                        if x==0:
-                            for x in guides:
-                                x.draw(screen)
-                        elif x==1:
-                            if activeGraph0==0: 
-                                petriButton.active = 1
-                                tsButton.active = 0
-                            else:
-                                screen.blit(note0, whiteboard) 
-                                petriButton.active = 0
-                                tsButton.active = 1
-                            petriButton.draw(screen)
-                            tsButton.draw(screen)
-                            text0.draw(screen)
-                            text1.draw(screen)
-                            text2.draw(screen)
-                            text3.draw(screen)
-                            text4.draw(screen)
-                            text5.draw(screen)
-                            for x in range(len(token0)):
-                                token0[x].draw(screen)
-                                upButtons[x].draw(screen)
-                                downButtons[x].draw(screen)  
-                            graph0[activeGraph0].draw(screen)
-                        elif x==2:
-                            if activeGraph1==0: 
-                                petriButton.active = 1
-                                tsButton.active = 0
-                            else:
-                                screen.blit(note0, whiteboard) 
-                                petriButton.active = 0
-                                tsButton.active = 1
-                            petriButton.draw(screen)
-                            tsButton.draw(screen)
-                            text0.draw(screen)
-                            text1.draw(screen)
-                            text2.draw(screen)
-                            for x in range(len(token1)):
-                                token1[x].draw(screen)
-                                upButtons[x].draw(screen)
-                                downButtons[x].draw(screen)
-                            graph1[activeGraph1].draw(screen)
-                        elif x==3:
-                            text6.draw(screen)
-                            text7.draw(screen)
-                            text8.draw(screen)
-                            for x in range(len(token2)):
-                                token2[x].draw(screen)
-                                upButtons[x + 3].draw(screen)
-                                downButtons[x + 3].draw(screen)
-                            graph2.draw(screen)
-                        elif x==4:
-                            if activeGraph3==0: 
-                                petriButton.active = 1
-                                tsButton.active = 0
-                            else:
-                                screen.blit(note1, whiteboard) 
-                                petriButton.active = 0
-                                tsButton.active = 1
-                            petriButton.draw(screen)
-                            tsButton.draw(screen)
-                            text0.draw(screen)
-                            text1.draw(screen)
-                            text2.draw(screen)
-                            text6.draw(screen)
-                            text7.draw(screen)
-                            text8.draw(screen)
-                            for x in range(len(token3)):
-                                token3[x].draw(screen)
-                                upButtons[x].draw(screen)
-                                downButtons[x].draw(screen) 
-                            graph3[activeGraph3].draw(screen)
-                        if mode!=0: createButton.draw(screen)                           
+                        modes[mode].draw(screen)
                         #Button(whiteboard, "Set initial marking and click CREATE button to create a new petrinet").draw(screen)
                         pygame.display.flip()
                         break
         elif event.type == pygame.MOUSEBUTTONUP:
-            if mode==1:
-                if activeGraph0==0:
-                    for x in graph0[0].places.values():
-                        if x.isClicked:
-                            x.isClicked = 0
-                            break
-                    for x in graph0[0].transitions.values():
-                        if x.isClicked:
-                            if x.isMoving==0 and graph0[0].isEnable(x.name):
-                                graph0[0].firing(x.name)
-                                pygame.draw.rect(screen, WHITE, whiteboard)
-                                graph0[0].draw(screen)
-                                #pygame.display.update(whiteboard)
-                            x.isMoving = 0
-                            x.isClicked = 0
-                            break
-                else:
-                    for x in graph0[1].states.values():
-                        if x.isClicked:
-                            x.isClicked = 0
-                            break
-            elif mode==2:
-                if activeGraph1==0:
-                    for x in graph1[0].places.values():
-                        if x.isClicked:
-                            x.isClicked = 0
-                            break
-                    for x in graph1[0].transitions.values():
-                        if x.isClicked:
-                            if x.isMoving==0 and graph1[0].isEnable(x.name):
-                                graph1[0].firing(x.name)
-                                pygame.draw.rect(screen, WHITE, whiteboard)
-                                graph1[0].draw(screen)
-                                #pygame.display.update(whiteboard)
-                            x.isMoving = 0
-                            x.isClicked = 0
-                            break
-                else:
-                    for x in graph1[1].states.values():
-                        if x.isClicked:
-                            x.isClicked = 0
-                            break
-            elif mode==3:
-                for x in graph2.places.values():
-                    if x.isClicked:
-                        x.isClicked = 0
-                        break
-                for x in graph2.transitions.values():
-                    if x.isClicked:
-                        if x.isMoving==0 and graph2.isEnable(x.name):
-                            graph2.firing(x.name)
-                            pygame.draw.rect(screen, WHITE, whiteboard)
-                            graph2.draw(screen)
-                            #pygame.display.update(whiteboard)
-                        x.isMoving = 0
-                        x.isClicked = 0
-                        break
-            elif mode==4:
-                    if activeGraph3==0:
-                        for x in graph3[0].places.values():
-                            if x.isClicked:
-                                x.isClicked = 0
-                                break
-                        for x in graph3[0].transitions.values():
-                            if x.isClicked:
-                                if x.isMoving==0 and graph3[0].isEnable(x.name):
-                                    graph3[0].firing(x.name)
-                                    pygame.draw.rect(screen, WHITE, whiteboard)
-                                    graph3[0].draw(screen)
-                                    #pygame.display.update(whiteboard)
-                                x.isMoving = 0
-                                x.isClicked = 0
-                                break
-                    else:
-                        for x in graph3[1].states.values():
-                            if x.isClicked:
-                                x.isClicked = 0
-                                break
+            if dragged is not None:
+                source, key, x, note = dragged
+                if isinstance(x, Transition) and x.isMoving==0 and source.isEnable(key):  # a click on an enabled transition fires it
+                    scene = source.scene(whiteboard)
+                    for y in source.firingChanges(key): scene.touch(y)
+                    source.firing(key)
+                    pygame.display.update(scene.flush(screen))
+                x.isMoving = 0
+                x.isClicked = 0
+                dragged = None
         elif event.type == pygame.WINDOWSIZECHANGED:
             kx = event.x/WIDTH
             ky = event.y/HEIGHT
             WIDTH = event.x
             HEIGHT = event.y
             refeshScreen(kx, ky)
-        elif event.type == pygame.WINDOWFOCUSGAINED:
+        elif event.type in (pygame.WINDOWFOCUSGAINED, pygame.WINDOWEXPOSED):
             pygame.display.flip()
-
-
-
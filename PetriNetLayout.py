@@ -0,0 +1,216 @@
+#####################################
+######## node placement for the Petri Net and Transition System views, independent of pygame
+#### a graph is a number of nodes n and a list of (source, target) edges between nodes 0 .. n-1,
+#### a layout is two lists xs, ys of coordinates in [0, 1], the caller scales them to its whiteboard
+import math
+import random
+
+#### return the BFS depth of every node from the 'roots', nodes not reachable from them start a new BFS from the lowest such node.
+#### Edges are followed in their direction, so a reachability graph gets one layer per firing from the initial state
+def layers(n, edges, roots = (0,)):
+    succ = [[] for x in range(n)]
+    for x, y in edges:
+        succ[x].append(y)
+    depth = [-1]*n
+    order = []  # nodes in BFS order
+    deepest = -1    # largest depth given so far
+    starts = [x for x in roots if 0 <= x < n] + list(range(n))
+    roots = set(roots)
+    for root in starts:
+        if depth[root] != -1:
+            continue
+        depth[root] = 0 if root in roots else deepest + 1
+        deepest = max(deepest, depth[root])
+        head = len(order)
+        order.append(root)
+        while head < len(order):
+            x = order[head]
+            head += 1
+            for y in succ[x]:
+                if depth[y] == -1:
+                    depth[y] = depth[x] + 1
+                    deepest = max(deepest, depth[y])
+                    order.append(y)
+    return depth, order
+
+#### layered (Sugiyama style) layout: nodes go to the row of their BFS depth, then every row is sorted by the barycenter
+#### of the neighbours in the row above (downward sweeps) or below (upward sweeps) to reduce crossings.
+#### Deterministic, O(sweeps*(n + edges) log n)
+def layeredLayout(n, edges, roots = (0,), sweeps = 4):
+    if n == 0:
+        return [], []
+    depth, order = layers(n, edges, roots)
+    rows = [[] for x in range(max(depth) + 1)]
+    for x in order:
+        rows[depth[x]].append(x)
+    up = [[] for x in range(n)]     # neighbours one row above
+    down = [[] for x in range(n)]   # neighbours one row below
+    for x, y in edges:
+        if depth[y] == depth[x] + 1:
+            up[y].append(x)
+            down[x].append(y)
+        elif depth[x] == depth[y] + 1:
+            up[x].append(y)
+            down[y].append(x)
+    position = [0]*n    # index of every node in its row
+    for row in rows:
+        for i, x in enumerate(row):
+            position[x] = i
+    for sweep in range(sweeps):
+        if sweep % 2 == 0:
+            sequence, near = range(1, len(rows)), up
+        else:
+            sequence, near = range(len(rows) - 2, -1, -1), down
+        for r in sequence:
+            row = rows[r]
+            def barycenter(x):
+                if not near[x]:
+                    return position[x]
+                return sum(position[y] for y in near[x])/len(near[x])
+            row.sort(key = barycenter)
+            for i, x in enumerate(row):
+                position[x] = i
+    xs = [0.0]*n
+    ys = [0.0]*n
+    for r, row in enumerate(rows):
+        y = r/(len(rows) - 1) if len(rows) > 1 else 0.5
+        for i, x in enumerate(row):
+            xs[x] = (i + 1)/(len(row) + 1)
+            ys[x] = y
+    return xs, ys
+
+#### QuadTree: Barnes-Hut tree of weighted points in a square, a cell far enough from a point acts as one point at its center of mass.
+#### Cells are kept in flat lists, cell 0 is the root
+class QuadTree:
+    def __init__(self, xs, ys) -> None:
+        left, top = min(xs), min(ys)
+        size = max(max(xs) - left, max(ys) - top, 1e-9)*1.0001
+        self.left = [left]  # cell -> left of its square
+        self.top = [top]    # cell -> top of its square
+        self.size = [size]  # cell -> side of its square
+        self.mass = [0]     # cell -> number of points inside
+        self.sumx = [0.0]   # cell -> sum of the x of its points, the center of mass is sumx/mass
+        self.sumy = [0.0]
+        self.child = [-1]   # cell -> index of its first child, the 4 children are consecutive, -1 for a leaf
+        self.point = [-1]   # leaf -> the point it holds, -1 if empty or if it holds several points at the same place
+        for p in range(len(xs)):
+            self.insert(p, xs[p], ys[p])
+
+    def quadrant(self, c, x, y) -> int:
+        half = self.size[c]/2
+        return (x >= self.left[c] + half) + 2*(y >= self.top[c] + half)
+
+    def split(self, c) -> None: # give 4 children to the leaf c
+        half = self.size[c]/2
+        self.child[c] = len(self.size)
+        for q in range(4):
+            self.left.append(self.left[c] + half*(q & 1))
+            self.top.append(self.top[c] + half*(q >> 1))
+            self.size.append(half)
+            self.mass.append(0)
+            self.sumx.append(0.0)
+            self.sumy.append(0.0)
+            self.child.append(-1)
+            self.point.append(-1)
+
+    def insert(self, p, x, y) -> None:
+        c = 0
+        while True:
+            self.mass[c] += 1
+            self.sumx[c] += x
+            self.sumy[c] += y
+            if self.child[c] == -1:
+                if self.mass[c] == 1:
+                    self.point[c] = p
+                    return
+                if self.size[c] < 1e-9: # points at the same place stay together in one leaf
+                    self.point[c] = -1
+                    return
+                old = self.point[c]
+                self.point[c] = -1
+                self.split(c)
+                if old != -1:   # push the point already here one level down
+                    ox = self.sumx[c] - x
+                    oy = self.sumy[c] - y
+                    o = self.child[c] + self.quadrant(c, ox, oy)
+                    self.mass[o] += 1
+                    self.sumx[o] += ox
+                    self.sumy[o] += oy
+                    self.point[o] = old
+            c = self.child[c] + self.quadrant(c, x, y)
+
+    def force(self, p, x, y, k2, theta):    # return the repulsion (fx, fy) on point p at (x, y), k2/d per unit of mass
+        fx = fy = 0.0
+        stack = [0]
+        while stack:
+            c = stack.pop()
+            m = self.mass[c]
+            if m == 0 or self.point[c] == p:
+                continue
+            dx = x - self.sumx[c]/m
+            dy = y - self.sumy[c]/m
+            d2 = dx*dx + dy*dy
+            if self.child[c] == -1 or self.size[c]*self.size[c] < theta*theta*d2:
+                if self.child[c] == -1 and self.point[c] == -1 and d2 == 0:
+                    continue    # a pile of points at this very place, p among them
+                if d2 < 1e-12:
+                    dx, dy, d2 = 1e-6*(p % 7 - 3), 1e-6*(p % 5 - 2), 1e-11
+                f = k2*m/d2
+                fx += dx*f
+                fy += dy*f
+            else:
+                first = self.child[c]
+                stack.extend((first, first + 1, first + 2, first + 3))
+        return fx, fy
+
+#### force-directed layout (Fruchterman-Reingold): edges pull their ends together, every pair of nodes pushes apart.
+#### The repulsion is computed with a Barnes-Hut QuadTree, O(n log n) per iteration instead of O(n^2).
+#### It starts from 'start' (xs, ys), by default the layered layout, nodes are moved by a seeded jitter, so equal seeds give equal layouts
+def forceLayout(n, edges, iterations = 50, seed = 0, theta = 0.8, start = None, roots = (0,)):
+    if n == 0:
+        return [], []
+    xs, ys = start if start is not None else layeredLayout(n, edges, roots)
+    xs, ys = list(xs), list(ys)
+    rng = random.Random(seed)
+    for p in range(n):
+        xs[p] += (rng.random() - 0.5)*1e-3
+        ys[p] += (rng.random() - 0.5)*1e-3
+    if n == 1:
+        return [0.5], [0.5]
+    k = 1/math.sqrt(n)  # ideal edge length in the unit square
+    k2 = k*k
+    temperature = 0.1
+    for it in range(iterations):
+        tree = QuadTree(xs, ys)
+        dxs = [0.0]*n
+        dys = [0.0]*n
+        for p in range(n):
+            dxs[p], dys[p] = tree.force(p, xs[p], ys[p], k2, theta)
+        for x, y in edges:
+            if x == y:
+                continue
+            dx = xs[x] - xs[y]
+            dy = ys[x] - ys[y]
+            d = math.sqrt(dx*dx + dy*dy) + 1e-12
+            f = d/k
+            dxs[x] -= dx*f
+            dys[x] -= dy*f
+            dxs[y] += dx*f
+            dys[y] += dy*f
+        for p in range(n):  # move at most 'temperature' and stay in the unit square
+            d = math.sqrt(dxs[p]*dxs[p] + dys[p]*dys[p])
+            if d > 0:
+                step = min(d, temperature)/d
+                xs[p] = min(max(xs[p] + dxs[p]*step, 0.0), 1.0)
+                ys[p] = min(max(ys[p] + dys[p]*step, 0.0), 1.0)
+        temperature *= 1 - 1/iterations if iterations > 1 else 1
+    return normalize(xs, ys)
+
+#### scale the coordinates to fill [0, 1] on both axes, keeping a degenerate axis at 0.5
+def normalize(xs, ys):
+    def scale(v):
+        low, high = min(v), max(v)
+        if high - low < 1e-12:
+            return [0.5]*len(v)
+        return [(a - low)/(high - low) for a in v]
+    return scale(xs), scale(ys)
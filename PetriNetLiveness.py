@@ -0,0 +1,116 @@
+#####################################
+######## strongly connected components, terminal components and liveness of a compact ReachabilityGraph
+#### every routine walks the CSR arrays of the graph with explicit stacks and keeps one array entry per state,
+#### so graphs of millions of states never reach the recursion limit nor build a dict per state
+from array import array
+
+#### return (component, count): component[s] is the strongly connected component of state s, numbered 0 .. count-1.
+#### Iterative Tarjan: a component is numbered when its root is finished, so every edge goes to a component with a smaller
+#### or equal number (reverse topological order). States not expanded yet have no out edges here
+def components(graph):
+    return tarjan(len(graph), graph.expanded(), graph.offsets, graph.targets)
+
+#### components() over CSR arrays: 'n' states, the out edges of the first 'rows' are targets[offsets[s] .. offsets[s+1]-1]
+def tarjan(n, rows, offsets, targets):
+    index = array('l', [-1])*n  # DFS order of every state, -1 if not visited
+    low = array('l', [0])*n     # smallest DFS order reachable through the DFS subtree and one edge back
+    component = array('l', [-1])*n
+    stack = array('l')  # visited states whose component is not known yet
+    callStates = array('l') # the DFS path, replacing the recursion
+    callEdges = array('l')  # next edge to follow of every state of the path
+    counter = 0
+    count = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        callStates.append(root)
+        callEdges.append(offsets[root] if root < rows else 0)
+        while callStates:
+            s = callStates[-1]
+            e = callEdges[-1]
+            if s < rows and e < offsets[s + 1]:
+                callEdges[-1] = e + 1
+                t = targets[e]
+                if index[t] == -1:
+                    index[t] = low[t] = counter
+                    counter += 1
+                    stack.append(t)
+                    callStates.append(t)
+                    callEdges.append(offsets[t] if t < rows else 0)
+                elif component[t] == -1 and index[t] < low[s]:  # t is still on the stack
+                    low[s] = index[t]
+                continue
+            callStates.pop()
+            callEdges.pop()
+            if low[s] == index[s]:
+                while True:
+                    x = stack.pop()
+                    component[x] = count
+                    if x == s: break
+                count += 1
+            if callStates and low[s] < low[callStates[-1]]:
+                low[callStates[-1]] = low[s]
+    return component, count
+
+#### return a bytearray with 1 for every terminal component (no edge leaves it), 'component' and 'count' as components() returns.
+#### A component holding a state not expanded yet is not terminal, its out edges are unknown
+def terminalComponents(graph, component, count):
+    terminal = bytearray([1])*count
+    rows = graph.expanded()
+    offsets, targets = graph.offsets, graph.targets
+    for s in range(rows):
+        c = component[s]
+        for e in range(offsets[s], offsets[s + 1]):
+            if component[targets[e]] != c:
+                terminal[c] = 0
+                break
+    for s in range(rows, len(graph)):
+        terminal[component[s]] = 0
+    return terminal
+
+#### return the liveness level of every transition of the net of 'graph':
+#### 0 (L0, dead): it never fires, 1 (L1): it fires in some reachable marking,
+#### 3 (L3, so also L2): it fires infinitely often in some run, i.e: it labels an edge inside a component,
+#### 4 (L4, live): it can fire again from every reachable marking, i.e: it labels an edge inside every terminal component.
+#### On a finite graph L2 and L3 are the same, firing t more times than there are states needs a cycle through t.
+#### Raise ValueError if the graph is truncated or reduced, liveness needs every state and every interleaving
+def liveness(graph, component = None, count = None):
+    if graph.truncated or graph.reduced:
+        raise ValueError("liveness needs a complete graph built without stubborn sets")
+    if component is None:
+        component, count = components(graph)
+    terminal = terminalComponents(graph, component, count)
+    offsets, targets, labels = graph.offsets, graph.targets, graph.labels
+    levels = [0]*len(graph.net.transNames)
+    seen = set()    # (terminal component, transition) pairs of the edges inside terminal components
+    for s in range(graph.expanded()):
+        c = component[s]
+        for e in range(offsets[s], offsets[s + 1]):
+            t = labels[e]
+            if component[targets[e]] != c:
+                if levels[t] == 0: levels[t] = 1
+            else:
+                levels[t] = 3
+                if terminal[c]: seen.add((c, t))
+    terminals = sum(terminal)
+    inTerminals = [0]*len(levels)
+    for c, t in seen:
+        inTerminals[t] += 1
+    for t in range(len(levels)):
+        if inTerminals[t] == terminals:
+            levels[t] = 4
+    return levels
+
+#### return a dict summing up the behavior of 'graph': its 'components' and 'terminalComponents' counts, its 'deadlocks' states,
+#### 'reversible' (the initial state is reachable from every state) and, for a complete graph not reduced, the liveness 'levels'
+#### of the transitions and 'live' (every transition is L4), else None for these two
+def behavior(graph):
+    component, count = components(graph)
+    terminal = terminalComponents(graph, component, count)
+    complete = not graph.truncated and not graph.reduced
+    levels = liveness(graph, component, count) if complete else None
+    return {"components" : count, "terminalComponents" : sum(terminal), "deadlocks" : graph.deadlocks(),
+        "reversible" : count == 1 if complete else None, "levels" : levels, "live" : all(x == 4 for x in levels) if complete else None}
@@ -0,0 +1,194 @@
+#####################################
+######## structural analysis of a CompiledNet from its incidence matrix, no state is explored
+#### a P-invariant y (one weight per place) keeps y.M constant in every reachable marking M, so a place covered by a
+#### P-invariant is bounded by y.M0 / y[p]. A T-invariant x (one count per transition) is a firing count vector that
+#### reproduces the marking it starts from
+import math
+import time
+
+#### return the incidence matrix of 'net' as a list of rows, one per place: matrix[p][t] is the change of place p when t fires
+def incidence(net):
+    matrix = [[0]*len(net.transNames) for p in net.placeNames]
+    for t in range(len(net.transNames)):
+        for p, d in net.delta[t]:
+            matrix[p][t] = d
+    return matrix
+
+#### return the transpose of a list of rows with 'columns' columns
+def transpose(matrix, columns):
+    return [[row[j] for row in matrix] for j in range(columns)]
+
+#### keep the rows (values, vector, support) whose support does not strictly contain the support of another row, and drop duplicates.
+#### Only the 'fresh' rows and the rows they may make redundant are compared, the others are already minimal among themselves
+def minimal(old, fresh):
+    fresh = sorted(fresh, key = lambda x: bin(x[2]).count("1"))
+    kept = []
+    seen = set()
+    for row in fresh:
+        key = (row[2], tuple(sorted(row[1].items())))
+        if key in seen or any(x[2] & row[2] == x[2] and (x[2] != row[2] or x[1] == row[1]) for x in old) or any(x[2] & row[2] == x[2] and x[2] != row[2] for x in kept):
+            continue
+        seen.add(key)
+        kept.append(row)
+    return [x for x in old if not any(y[2] & x[2] == y[2] and y[2] != x[2] for y in kept)] + kept
+
+#### return the minimal support semi-positive integer vectors y with y.matrix = 0, 'matrix' has one row per entry of y.
+#### Farkas (Fourier-Motzkin) elimination: every column of the matrix is cancelled in turn by positive combinations of two
+#### rows with opposite signs in it, taking first the column making the fewest combinations. Rows whose support strictly
+#### contains the support of another row are pruned after every column, the others are divided by the gcd of their entries.
+#### Rows are sparse: dicts of their non-zero columns and vector entries. Raise ValueError when more than 'limit' rows are alive
+def farkas(matrix, columns, limit = 100000):
+    n = len(matrix)
+    rows = [({j : v for j, v in enumerate(matrix[i]) if v != 0}, {i : 1}, 1 << i) for i in range(n)]  # (matrix part, vector, support of the vector)
+    left = set(range(columns))
+    while left:
+        positive = [0]*columns
+        negative = [0]*columns
+        for x in rows:
+            for j, v in x[0].items():
+                if v > 0: positive[j] += 1
+                else: negative[j] += 1
+        j = min(left, key = lambda c: positive[c]*negative[c] - positive[c] - negative[c])
+        left.remove(j)
+        old = [x for x in rows if j not in x[0]]
+        fresh = []
+        for a in rows:
+            if a[0].get(j, 0) <= 0:
+                continue
+            for b in rows:
+                if b[0].get(j, 0) >= 0:
+                    continue
+                ka, kb = -b[0][j], a[0][j]  # ka*a + kb*b is 0 in column j
+                values = {}
+                for c, v in a[0].items(): values[c] = ka*v
+                for c, v in b[0].items(): values[c] = values.get(c, 0) + kb*v
+                vector = {}
+                for c, v in a[1].items(): vector[c] = ka*v
+                for c, v in b[1].items(): vector[c] = vector.get(c, 0) + kb*v
+                divisor = 0
+                for v in vector.values(): divisor = math.gcd(divisor, v)
+                for v in values.values(): divisor = math.gcd(divisor, v)
+                fresh.append(({c : v//divisor for c, v in values.items() if v != 0}, {c : v//divisor for c, v in vector.items()}, a[2] | b[2]))
+        rows = minimal(old, fresh)
+        if len(rows) > limit:
+            raise ValueError("more than %d rows in the Farkas elimination" % limit)
+    return [[x[1].get(i, 0) for i in range(n)] for x in rows]
+
+#### return the minimal support P-invariants of 'net', one weight per place
+def pInvariants(net, limit = 100000):
+    return farkas(incidence(net), len(net.transNames), limit)
+
+#### return the minimal support T-invariants of 'net', one count per transition
+def tInvariants(net, limit = 100000):
+    return farkas(transpose(incidence(net), len(net.transNames)), len(net.placeNames), limit)
+
+#### return the upper bound of every place given by the P-invariants 'invariants' from the marking vector 'marking',
+#### None for a place no invariant covers (it may still be bounded)
+def placeBounds(net, marking, invariants = None):
+    if invariants is None:
+        invariants = pInvariants(net)
+    bounds = [None]*len(net.placeNames)
+    for y in invariants:
+        total = sum(w*m for w, m in zip(y, marking))
+        for p, w in enumerate(y):
+            if w > 0 and (bounds[p] is None or total//w < bounds[p]):
+                bounds[p] = total//w
+    return bounds
+
+#### True if every entry is in the support of one of the 'invariants': for P-invariants the net is then conservative
+#### (structurally bounded), for T-invariants it is consistent
+def covers(invariants, n) -> bool:
+    covered = [False]*n
+    for y in invariants:
+        for i, w in enumerate(y):
+            if w > 0: covered[i] = True
+    return all(covered)
+
+#### return the places of the bitmask 'mask' as a sorted list of indices
+def members(mask):
+    places = []
+    p = 0
+    while mask:
+        if mask & 1: places.append(p)
+        mask >>= 1
+        p += 1
+    return places
+
+#### return the minimal non-empty sets S of places (as bitmasks) such that every transition t of into[p], p in S, has a place
+#### of the bitmask needs[t] in S. Depth first search: a set is grown with one place of needs[t] for the first unmet t, the
+#### places tried in earlier branches are excluded from the later ones so every set is made once, and sets holding an
+#### already found one are cut. Return (sets, False) if time.monotonic() passes 'deadline' before the search ends
+def minimalSets(size, into, needs, deadline = None):
+    found = []
+    stack = [(1 << p, ((1 << size) - 1) & ~((2 << p) - 1)) for p in range(size - 1, -1, -1)] # (set, places allowed to join it)
+    steps = 0
+    while stack:
+        steps += 1
+        if deadline is not None and steps % 256 == 0 and time.monotonic() > deadline:
+            return sorted(found), False
+        chosen, allowed = stack.pop()
+        if any(x & chosen == x for x in found):
+            continue
+        best = None     # the unmet transition with the fewest places allowed to meet it
+        for p in members(chosen):
+            for t in into[p]:
+                if needs[t] & chosen == 0:
+                    count = bin(needs[t] & allowed).count("1")
+                    if best is None or count < best[0]:
+                        best = (count, t)
+        if best is None:
+            found = [x for x in found if x & chosen != chosen] + [chosen]
+            continue
+        choices = needs[best[1]] & allowed
+        for q in reversed(members(choices)):    # the first choice is popped first, the later ones exclude it
+            stack.append((chosen | (1 << q), allowed & ~(choices & ((2 << q) - 1))))
+    return sorted(found), True
+
+#### return the minimal siphons of 'net' as sorted lists of place indices, and False if 'deadline' stopped the search.
+#### A siphon S takes a token from S in every transition putting one in S, once empty it stays empty
+def minimalSiphons(net, deadline = None):
+    producers = [[] for p in net.placeNames]
+    for t in range(len(net.transNames)):
+        for p, w in net.post[t]:
+            producers[p].append(t)
+    needs = [sum(1 << p for p, w in net.pre[t]) for t in range(len(net.transNames))]
+    sets, complete = minimalSets(len(net.placeNames), producers, needs, deadline)
+    return [members(x) for x in sets], complete
+
+#### return the minimal traps of 'net' as sorted lists of place indices, and False if 'deadline' stopped the search.
+#### A trap Q puts a token in Q in every transition taking one from Q, once marked it stays marked
+def minimalTraps(net, deadline = None):
+    needs = [sum(1 << p for p, w in net.post[t]) for t in range(len(net.transNames))]
+    sets, complete = minimalSets(len(net.placeNames), net.consumers, needs, deadline)
+    return [members(x) for x in sets], complete
+
+#### return the largest trap inside the places 'places' as a sorted list, empty if there is none
+def maximalTrap(net, places):
+    trap = set(places)
+    changed = True
+    while changed:
+        changed = False
+        for p in list(trap):
+            if any(not any(q in trap for q, w in net.post[t]) for t in net.consumers[p]):
+                trap.remove(p)
+                changed = True
+    return sorted(trap)
+
+#### structural deadlock pre-check of 'net' from the marking vector 'marking' within 'timeout' seconds, return a dict:
+#### 'siphons' and 'traps' (minimal ones, lists of place indices), 'complete' (False if the time ran out),
+#### 'emptySiphons': the minimal siphons with no trap marked in 'marking', 'commoner': True if there is none (the siphon-trap
+#### property), 'deadlockFree': True if proved, None if unknown. The proof holds for ordinary nets (every arc weight is 1)
+#### with the siphon-trap property, and for nets with a transition needing no token
+def siphonTrapCheck(net, marking, timeout = None):
+    start = time.monotonic()
+    deadline = None if timeout is None else start + timeout
+    siphons, siphonsComplete = minimalSiphons(net, deadline)
+    traps, trapsComplete = minimalTraps(net, deadline)
+    empty = [x for x in siphons if not any(marking[p] > 0 for p in maximalTrap(net, x))]
+    ordinary = all(w == 1 for t in range(len(net.transNames)) for p, w in net.pre[t] + net.post[t])
+    commoner = None if not siphonsComplete and len(empty) == 0 else len(empty) == 0
+    deadlockFree = None
+    if len(net.sources) > 0 or (ordinary and commoner and len(net.transNames) > 0):
+        deadlockFree = True
+    return {"siphons" : siphons, "traps" : traps, "complete" : siphonsComplete and trapsComplete, "emptySiphons" : empty,
+        "commoner" : commoner, "ordinary" : ordinary, "deadlockFree" : deadlockFree, "seconds" : time.monotonic() - start}
@@ -0,0 +1,189 @@
+#####################################
+######## symbolic reachable set of a 1-safe Petri Net, using a pure Python BDD
+#### a marking of a safe net is a boolean vector (place p is marked or not), a set of markings is a BDD over those vectors,
+#### so the reachable set is computed without enumerating its states
+
+#### BDD: reduced ordered binary decision diagrams over the variables 0 .. size-1
+#### a node is an int, 0 is False, 1 is True, every other node tests var[u] and goes to low[u] (var is 0) or high[u] (var is 1)
+class BDD:
+    def __init__(self, size) -> None:
+        self.size = size    # number of variables, also the var of the two terminal nodes
+        self.var = [size, size] # node -> tested variable
+        self.low = [0, 1]   # node -> child when the variable is 0
+        self.high = [0, 1]  # node -> child when the variable is 1
+        self.unique = {}    # (var, low, high) -> node, so that equal functions are equal nodes
+        self.cache = {}     # computed table of and / or / exists
+
+    def __len__(self) -> int:   # number of nodes ever created
+        return len(self.var)
+
+    def mk(self, v, low, high): # return the node testing variable v with the given children
+        if low == high:
+            return low
+        key = (v, low, high)
+        u = self.unique.get(key)
+        if u is None:
+            u = len(self.var)
+            self.var.append(v)
+            self.low.append(low)
+            self.high.append(high)
+            self.unique[key] = u
+        return u
+
+    def cube(self, values): # return the conjunction of literals, 'values' is a dict variable -> 0 or 1
+        u = 1
+        for v in sorted(values, reverse = True):
+            u = self.mk(v, 0, u) if values[v] else self.mk(v, u, 0)
+        return u
+
+    def AND(self, u, v):
+        if u == 0 or v == 0: return 0
+        if u == 1 or u == v: return v
+        if v == 1: return u
+        return self.apply("and", u, v)
+
+    def OR(self, u, v):
+        if u == 1 or v == 1: return 1
+        if u == 0 or u == v: return v
+        if v == 0: return u
+        return self.apply("or", u, v)
+
+    def apply(self, op, u, v):  # shannon expansion of the commutative operation 'op' on nodes u and v.
+        cache = self.cache      # An explicit stack replaces the recursion, one entry per variable level of a BDD
+        var, low, high = self.var, self.low, self.high
+        absorbing = 0 if op == "and" else 1     # for a <= b, a terminal or a == b, 'a op b' is a if a is absorbing, else b
+        if u > v: u, v = v, u
+        stack = [(u, v)]    # pairs whose result is wanted, a pair is computed when the results of its two children are known
+        while stack:
+            a, b = stack[-1]
+            if (op, a, b) in cache:
+                stack.pop()
+                continue
+            x, y = var[a], var[b]
+            m = x if x < y else y
+            a0, a1 = (low[a], high[a]) if x == m else (a, a)
+            b0, b1 = (low[b], high[b]) if y == m else (b, b)
+            if a0 > b0: a0, b0 = b0, a0
+            if a1 > b1: a1, b1 = b1, a1
+            if a0 < 2 or a0 == b0:
+                r0 = a0 if a0 == absorbing else b0
+            else:
+                r0 = cache.get((op, a0, b0))
+                if r0 is None: stack.append((a0, b0))
+            if a1 < 2 or a1 == b1:
+                r1 = a1 if a1 == absorbing else b1
+            else:
+                r1 = cache.get((op, a1, b1))
+                if r1 is None: stack.append((a1, b1))
+            if r0 is not None and r1 is not None:
+                cache[(op, a, b)] = self.mk(m, r0, r1)
+                stack.pop()
+        return cache[(op, u, v)]
+
+    def exists(self, u, vars):  # existential quantification of the variables of the frozenset 'vars', with an explicit stack
+        cache = self.cache
+        top = max(vars)
+        stack = []  # nodes whose result is wanted, as in apply
+        def known(x):   # result for node x if it is found without expansion, else push x and return None
+            if x < 2 or self.var[x] > top:
+                return x
+            r = cache.get(("exists", x, vars))
+            if r is None:
+                stack.append(x)
+            return r
+        r = known(u)
+        while stack:
+            x = stack[-1]
+            if ("exists", x, vars) in cache:
+                stack.pop()
+                continue
+            r0 = known(self.low[x])
+            r1 = known(self.high[x])
+            if r0 is not None and r1 is not None:
+                v = self.var[x]
+                cache[("exists", x, vars)] = self.OR(r0, r1) if v in vars else self.mk(v, r0, r1)
+                stack.pop()
+        return r if r is not None else cache[("exists", u, vars)]
+
+    def satCount(self, u) -> int:   # number of assignments of all 'size' variables satisfying u
+        counts = {0 : 0, 1 : 1}     # node -> assignments of the variables var[node] .. size-1
+        stack = [u]
+        while stack:
+            x = stack[-1]
+            if x in counts:
+                stack.pop()
+                continue
+            low, high = self.low[x], self.high[x]
+            if low in counts and high in counts:
+                counts[x] = counts[low]*2**(self.var[low] - self.var[x] - 1) + counts[high]*2**(self.var[high] - self.var[x] - 1)
+                stack.pop()
+            else:
+                if low not in counts: stack.append(low)
+                if high not in counts: stack.append(high)
+        return counts[u]*2**self.var[u]
+
+    def evaluate(self, u, values) -> bool:  # value of u for 'values', a sequence of 0/1 indexed by variable
+        while u > 1:
+            u = self.high[u] if values[self.var[u]] else self.low[u]
+        return u == 1
+
+#### SymbolicReachability: the reachable set of a 1-safe net (a CompiledNet with all arc weights 1) from a 0/1 marking vector
+#### variable p of the BDD is place p. The image of transition t keeps the markings enabling t, forgets its pre and post places
+#### and sets them to their value after firing. Images of all transitions are chained until the set stops growing.
+class SymbolicReachability:
+    def __init__(self, net, marking) -> None:
+        for t in range(len(net.transNames)):
+            if any(w != 1 for p, w in net.pre[t] + net.post[t]):
+                raise ValueError("symbolic reachability needs arc weights of 1, transition %r has another weight" % net.transNames[t])
+        if any(x not in (0, 1) for x in marking):
+            raise ValueError("symbolic reachability needs a 0/1 initial marking")
+        self.net = net
+        self.bdd = BDD(len(net.placeNames))
+        self.iterations = 0 # number of rounds of chained images until the fixpoint
+        bdd = self.bdd
+        self.enable = []    # enable[t] is the BDD of the markings enabling t
+        self.unsafe = []    # unsafe[t] is the BDD of the markings where one post place of t (not a pre place) is already marked
+        self.changed = []   # changed[t] is the frozenset of the pre and post places of t
+        self.assign = []    # assign[t] is the cube of the values of the changed places after firing t
+        for t in range(len(net.transNames)):
+            pre = {p for p, w in net.pre[t]}
+            post = {p for p, w in net.post[t]}
+            self.enable.append(bdd.cube({p : 1 for p in pre}))
+            unsafe = 0
+            for p in post - pre:
+                unsafe = bdd.OR(unsafe, bdd.cube({p : 1}))
+            self.unsafe.append(unsafe)
+            self.changed.append(frozenset(pre | post))
+            self.assign.append(bdd.cube({p : int(p in post) for p in pre | post}))
+        self.reachable = bdd.cube({p : marking[p] for p in range(len(marking))}) # BDD of the reachable markings
+        self.compute()
+
+    def image(self, states, t): # BDD of the markings reached by firing t once from 'states'
+        bdd = self.bdd
+        enabled = bdd.AND(states, self.enable[t])
+        if enabled == 0:
+            return 0
+        if bdd.AND(enabled, self.unsafe[t]) != 0:
+            raise ValueError("the net is not 1-safe, firing %r can put a second token in a place" % self.net.transNames[t])
+        if len(self.changed[t]) == 0:
+            return enabled
+        return bdd.AND(bdd.exists(enabled, self.changed[t]), self.assign[t])
+
+    def compute(self):  # chain the images of every transition until no new marking is found
+        bdd = self.bdd
+        while True:
+            self.iterations += 1
+            old = self.reachable
+            for t in range(len(self.net.transNames)):
+                self.reachable = bdd.OR(self.reachable, self.image(self.reachable, t))
+            bdd.cache = {}
+            if self.reachable == old:
+                break
+
+    def count(self) -> int: # number of reachable markings
+        return self.bdd.satCount(self.reachable)
+
+    def contains(self, marking) -> bool:    # True if the marking vector is reachable
+        if any(x not in (0, 1) for x in marking):
+            return False
+        return self.bdd.evaluate(self.reachable, marking)
@@ -0,0 +1,32 @@
+#####################################
+######## benchmark of PetriNetEngine.explore, run: python ReachabilityBenchmark.py [max states] [workers]
+#### the net is a ring of places 'p0' -> 't0' -> 'p1' -> ... -> 'p0' holding k tokens,
+#### it has C(k + n - 1, n - 1) reachable markings, k is raised until the state space reaches 'max states'
+#### if the build is linear, the time per state stays flat when the number of states grows
+import sys
+import time
+from math import comb
+from PetriNetEngine import CompiledNet, explore
+
+def ringNet(n):   # return a CompiledNet of a ring with n places and n transitions
+    places = ["p" + str(i) for i in range(n)]
+    transitions = ["t" + str(i) for i in range(n)]
+    arcs = []
+    for i in range(n):
+        arcs.append((places[i], transitions[i], 1))
+        arcs.append((transitions[i], places[(i + 1) % n], 1))
+    return CompiledNet(places, transitions, arcs)
+
+def run(maxStates, workers = 1, n = 4):
+    net = ringNet(n)
+    print("%10s %10s %10s %10s %12s" % ("tokens", "states", "edges", "seconds", "us/state"))
+    k = 8
+    while comb(k + n - 1, n - 1) <= maxStates:
+        start = time.perf_counter()
+        graph = explore(net, (k,) + (0,)*(n - 1), workers)
+        seconds = time.perf_counter() - start
+        print("%10d %10d %10d %10.3f %12.2f" % (k, len(graph), graph.numEdges(), seconds, 1e6*seconds/len(graph)))
+        k = int(k*1.5)
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000, int(sys.argv[2]) if len(sys.argv) > 2 else 1)
@@ -0,0 +1,110 @@
+#####################################
+######## checks of PetriNetBisimulation against naive definitions on small random nets, run with: python -m pytest
+import random
+from PetriNetCore import PetriNet
+from PetriNetEngine import CompiledNet, MarkingStore, ReachabilityGraph
+import PetriNetBisimulation
+import PetriNetLiveness
+
+#### return a random net of 'places' places and 'transitions' transitions, every arc weight is 1
+def randomNet(rng, places, transitions):
+    data = {"places" : {"p%d" % i : rng.choice([0, 1, 1, 2]) for i in range(places)}, "transitions" : ["t%d" % j for j in range(transitions)], "arcs" : []}
+    for j in range(transitions):
+        for i in range(places):
+            r = rng.random()
+            if r < 0.3: data["arcs"].append(["p%d" % i, "t%d" % j, 1])
+            elif r < 0.55: data["arcs"].append(["t%d" % j, "p%d" % i, 1])
+    return PetriNet.fromDict(data)
+
+#### return the complete reachability graphs of random nets with at most 60 states
+def randomGraphs(seed, count):
+    rng = random.Random(seed)
+    graphs = []
+    while len(graphs) < count:
+        graph = randomNet(rng, rng.randint(1, 5), rng.randint(2, 5)).explore(maxStates = 60)
+        if not graph.truncated:
+            graphs.append((graph, rng))
+    return graphs
+
+#### return the coarsest strong bisimulation as a block per state, by refining signatures in rounds
+def naiveStrong(graph):
+    part = [0]*len(graph)
+    blocks = 1
+    while True:
+        ids = {}
+        fresh = [ids.setdefault((part[s], frozenset((t, part[y]) for t, y in graph.successors(s))), len(ids)) for s in range(len(graph))]
+        if len(ids) == blocks:
+            return part
+        part = fresh
+        blocks = len(ids)
+
+#### return the branching bisimulation as a set of pairs, the greatest fixpoint of its definition, every hidden transition is one silent step
+def naiveBranching(graph, hidden):
+    n = len(graph)
+    steps = [[(-1 if t in hidden else t, y) for t, y in graph.successors(s)] for s in range(n)]
+    closure = []    # states reachable by silent steps
+    for s in range(n):
+        seen = {s}
+        stack = [s]
+        while stack:
+            x = stack.pop()
+            for t, y in steps[x]:
+                if t == -1 and y not in seen:
+                    seen.add(y)
+                    stack.append(y)
+        closure.append(seen)
+    relation = {(a, b) for a in range(n) for b in range(n)}
+    changed = True
+    while changed:
+        changed = False
+        for a, b in list(relation):
+            if (a, b) not in relation:
+                continue
+            for t, x in steps[a]:
+                if t == -1 and (x, b) in relation:
+                    continue
+                if not any((a, c) in relation and any(u == t and (x, y) in relation for u, y in steps[c]) for c in closure[b]):
+                    relation.discard((a, b))
+                    relation.discard((b, a))
+                    changed = True
+                    break
+    return relation
+
+def testStrongMatchesNaiveRefinement():
+    for graph, rng in randomGraphs(11, 110):
+        quotient = PetriNetBisimulation.minimize(graph)
+        reference = naiveStrong(graph)
+        for a in range(len(graph)):
+            for b in range(len(graph)):
+                assert (quotient.block[a] == quotient.block[b]) == (reference[a] == reference[b])
+        assert quotient.block[0] == 0
+        assert len(PetriNetBisimulation.minimize(quotient)) == len(quotient)
+        assert PetriNetLiveness.liveness(quotient) == PetriNetLiveness.liveness(graph)
+        assert all(quotient.find(graph.marking(s)) == quotient.block[s] for s in range(len(graph)))
+
+def testBranchingMatchesDefinition():
+    for graph, rng in randomGraphs(12, 110):
+        transitions = len(graph.net.transNames)
+        hidden = set(rng.sample(range(transitions), rng.randint(2, transitions)))
+        quotient = PetriNetBisimulation.minimize(graph, hidden)
+        relation = naiveBranching(graph, hidden)
+        for a in range(len(graph)):
+            for b in range(len(graph)):
+                assert (quotient.block[a] == quotient.block[b]) == ((a, b) in relation)
+
+def testHiddenTransitionsAreOneSilentStep():
+    # state 1 does h1 to 3 and w to 4, state 2 does h2 to 3 and w to 4: with h1 and h2 hidden they are branching bisimilar
+    net = CompiledNet(["s"], ["a", "b", "h1", "h2", "w"], [])
+    store = MarkingStore(1)
+    for s in range(5):
+        store.add((s,))
+    graph = ReachabilityGraph(net, store)
+    for edges in ([(0, 1), (1, 2)], [(2, 3), (4, 4)], [(3, 3), (4, 4)], [], []):
+        for t, y in edges:
+            graph.labels.append(t)
+            graph.targets.append(y)
+        graph.offsets.append(len(graph.targets))
+    quotient = PetriNetBisimulation.minimize(graph, [2, 3])
+    assert quotient.block[1] == quotient.block[2]
+    assert quotient.successors(0) == [(0, quotient.block[1]), (1, quotient.block[1])]
+    assert PetriNetBisimulation.branchingBlocks(graph, {2, 3})[1] == 3
@@ -0,0 +1,24 @@
+#####################################
+######## checks of PetriNetEngine, run with: python -m pytest
+from PetriNetCore import PetriNet
+
+#### return the net of p(tokens) -> t -> 3q beside two independent 2-place cycles: q overflows the field width while
+#### the cycles keep the other workers busy, so only some workers overflow in a level
+def overflowingNet(tokens = 60):
+    return PetriNet.fromDict({"places" : {"p" : tokens, "q" : 0, "a1" : 1, "a2" : 0, "b1" : 1, "b2" : 0},
+        "transitions" : ["t", "x1", "x2", "y1", "y2"],
+        "arcs" : [["p", "t", 1], ["t", "q", 3], ["a1", "x1", 1], ["x1", "a2", 1], ["a2", "x2", 1], ["x2", "a1", 1],
+            ["b1", "y1", 1], ["y1", "b2", 1], ["b2", "y2", 1], ["y2", "b1", 1]]})
+
+def testParallelMatchesSequentialWhenSomeWorkersOverflow():
+    net = overflowingNet()
+    sequential = net.explore()
+    assert len(sequential) == 244
+    for workers in (2, 3, 4):
+        parallel = net.explore(workers)
+        assert not parallel.truncated
+        assert len(parallel) == len(sequential)
+        assert list(parallel.offsets) == list(sequential.offsets)
+        assert list(parallel.targets) == list(sequential.targets)
+        assert list(parallel.labels) == list(sequential.labels)
+        assert all(parallel.marking(s) == sequential.marking(s) for s in range(len(sequential)))
@@ -0,0 +1,30 @@
+#####################################
+######## checks of PetriNetSymbolic, run with: python -m pytest
+from PetriNetCore import PetriNet
+from PetriNetSymbolic import BDD
+
+#### return the ring of 'size' places where one token goes round, every marking has one marked place
+def ringNet(size):
+    names = ["p%d" % i for i in range(size)]
+    return PetriNet.fromDict({"places" : {name : int(i == 0) for i, name in enumerate(names)},
+        "transitions" : ["t%d" % i for i in range(size)],
+        "arcs" : [["p%d" % i, "t%d" % i, 1] for i in range(size)] + [["t%d" % i, "p%d" % ((i + 1) % size), 1] for i in range(size)]})
+
+def testDeepBDDDoesNotRecurse():
+    size = 3000     # three times the default recursion limit
+    bdd = BDD(size)
+    even = bdd.cube({v : 1 for v in range(0, size, 2)})
+    odd = bdd.cube({v : 0 for v in range(1, size, 2)})
+    both = bdd.AND(even, odd)
+    assert both == bdd.cube({v : int(v % 2 == 0) for v in range(size)})
+    assert bdd.satCount(bdd.OR(even, odd)) == 2*2**(size//2) - 1
+    assert bdd.exists(both, frozenset(range(1, size, 2))) == even
+    assert bdd.satCount(bdd.exists(both, frozenset(range(size)))) == 2**size
+
+def testRingMatchesExplore():
+    for size in (1, 2, 5, 40):
+        net = ringNet(size)
+        symbolic = net.symbolicReachability()
+        graph = net.explore()
+        assert symbolic.count() == len(graph) == size
+        assert all(symbolic.contains(graph.marking(s)) for s in range(len(graph)))